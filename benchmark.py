@@ -0,0 +1,435 @@
+"""
+Benchmark suite of the engine, the AI levels and the stats I/O.
+
+Every benchmark is seeded and runs on fixed inputs: a corpus of positions
+given as the columns played from the empty board, and synthetic game
+histories of 1k, 100k and 1M games. The results are written as JSON and
+can be compared with a baseline saved by a previous run:
+
+    python benchmark.py --save-baseline benchmark_baseline.json
+    python benchmark.py --baseline benchmark_baseline.json
+
+A benchmark more than --tolerance slower than the baseline (25% by default)
+is reported as a regression and the exit code is 1. Runs happen in a
+temporary directory, so the stats files of the game are never touched.
+
+The solver group times the perfect level's solver on positions from ply 8
+to 28 and prints the first ply from which it solves all of them within
+SOLVER_TIME_LIMIT; before that ply the perfect level isn't exact.
+
+The startup group launches the game in new interpreters and fails when the
+first frame takes more than STARTUP_BUDGET seconds, baseline or not. The
+imports slowing the startup down are listed with:
+
+    python main.py --profile-imports
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from constants import *
+
+# Positions of the corpus, from the opening to the late middle game, none
+# of them decided within 5 plies (checked with the solver)
+POSITIONS = [
+    '322436',
+    '43343563',
+    '3125655356',
+    '652363303043',
+    '21332233451235',
+    '2443133362332260',
+    '233222122055560505',
+    '36403233330420525266',
+    '5631523504236433213644',
+    '213322334512350554443224',
+    '21332233451235055444322440',
+    '5360414341330334146600402151',
+]
+# The perfect level solves the positions exactly, only the late ones are used
+SOLVER_MIN_MOVES = 20
+
+# One position per even ply from 8 to 28, taken from expert games, with no
+# immediate win and no result within 5 plies. The solver group tells from
+# which ply the perfect level solves within SOLVER_TIME_LIMIT.
+SOLVER_POSITIONS = [
+    '21332233',
+    '2133223345',
+    '213322334512',
+    '21332233451235',
+    '1203322453312355',
+    '213322334512350554',
+    '21332233451235055444',
+    '5063321332205655631211',
+    '213322334512350554443224',
+    '21332233451235055444322440',
+    '5063321332205655631211130542',
+]
+
+HISTORY_SIZES = {'1k': 1000, '100k': 100000, '1M': 1000000}
+
+SEED = 12345
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Draws the first frame of the game in a new interpreter, then closes it
+FIRST_FRAME = (
+    "from gui import Connect4GUI\n"
+    "game = Connect4GUI()\n"
+    "game.root.update()\n"
+    "print('frame', flush=True)\n"
+    "game.close()\n"
+)
+
+
+def _measure(function, repeats, number=1):
+    """Runs function `number` times per repeat, returns timings per call"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        'median_s': statistics.median(timings),
+        'min_s': min(timings),
+        'repeats': repeats,
+        'number': number
+    }
+
+
+def _setup_game(game, position):
+    """Plays the columns of a corpus position on a reset game"""
+    game.reset_game()
+    for column in position:
+        game.place_token(int(column))
+        game.change_player()
+
+
+def _random_game(rng):
+    """Moves (row, column) of a random game, as stored in the stats files"""
+    from bitboard import BitBoard
+    board = BitBoard()
+    player = PLAYER_X
+    moves = []
+    while True:
+        column = rng.choice([col for col in range(COLUMNS) if board.can_play(col)])
+        row = board.play(column, player)
+        moves.append((row, column))
+        if board.last_move_wins():
+            return player, moves
+        if board.is_full():
+            return 'N', moves
+        player = PLAYER_O if player == PLAYER_X else PLAYER_X
+
+
+def write_synthetic_history(path, games, seed=SEED):
+    """Writes a stats CSV file of `games` games drawn from a pool of random games"""
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(500):
+        winner, moves = _random_game(rng)
+        pool.append((winner, str(moves)))
+    date = datetime(2024, 1, 1)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['date', 'gagnant', 'duree', 'coups'])
+        for i in range(games):
+            winner, moves = pool[rng.randrange(len(pool))]
+            timestamp = (date + timedelta(seconds=30 * i)).strftime("%Y-%m-%d %H:%M:%S")
+            writer.writerow([timestamp, winner, round(rng.uniform(5, 120), 2), moves])
+
+
+def bench_check_victory(repeats):
+    from game import Connect4
+    game = Connect4()
+    timings = []
+    for position in POSITIONS:
+        _setup_game(game, position)
+        timings.append(_measure(game.check_victory, repeats, number=2000)['median_s'])
+    # Time per call, median over the positions of the corpus
+    return {'engine.check_victory': {
+        'median_s': statistics.median(timings),
+        'min_s': min(timings),
+        'repeats': repeats,
+        'number': 2000 * len(POSITIONS)
+    }}
+
+
+def bench_ai_levels(repeats):
+    """choose_best_move of every level on the corpus, with fixed budgets"""
+    from game import Connect4
+    from mcts import MCTS
+    game = Connect4()
+    # Budgets in depth or iterations rather than time, so that the timings
+    # measure the speed of the AI and not the time limit
+    game.search.time_limit = None
+    game.search.max_depth = 6
+    game.solver.time_limit = None
+    game.parallel_search = None
+    results = {}
+    for level in (1, 2, 3, 4, 5):
+        game.ai_level = level
+        positions = POSITIONS
+        if level == 4:
+            positions = [p for p in POSITIONS if len(p) >= SOLVER_MIN_MOVES]
+
+        def run():
+            random.seed(SEED)
+            game.mcts = MCTS(time_limit=None, iterations=100, seed=SEED)
+            game.transposition_table.clear()
+            game.solver.reset_table()
+            for position in positions:
+                _setup_game(game, position)
+                game.choose_best_move()
+
+        timing = _measure(run, repeats)
+        timing['positions'] = len(positions)
+        results[f'ai.choose_best_move.level{level}'] = timing
+    return results
+
+
+def bench_solver(repeats):
+    """
+    Solver.analyze of each SOLVER_POSITIONS position with the time limit of
+    the perfect level: 'solved' is False when the perfect level falls back
+    to the book or the expert search on that position
+    """
+    from bitboard import BitBoard
+    from solver import Solver, SolverTimeout
+    solver = Solver(time_limit=SOLVER_TIME_LIMIT)
+    results = {}
+    for position in SOLVER_POSITIONS:
+        board = BitBoard()
+        for index, column in enumerate(position):
+            board.play(int(column), PLAYER_X if index % 2 == 0 else PLAYER_O)
+        player = PLAYER_X if len(position) % 2 == 0 else PLAYER_O
+        solved = []
+
+        def run():
+            solver.reset_table()
+            try:
+                solver.analyze(board, player)
+                solved.append(True)
+            except SolverTimeout:
+                solved.append(False)
+
+        timing = _measure(run, repeats)
+        timing['solved'] = all(solved)
+        results[f'solver.analyze.ply{len(position):02d}'] = timing
+    return results
+
+
+def perfect_from_ply(results):
+    """First ply from which every solver position was solved in time, None if the last one wasn't"""
+    plies = sorted((int(name[len('solver.analyze.ply'):]), timing['solved'])
+                   for name, timing in results.items() if name.startswith('solver.analyze.ply'))
+    first = None
+    for ply, solved in plies:
+        if not solved:
+            first = None
+        elif first is None:
+            first = ply
+    return first
+
+
+def bench_stats_io(sizes, workdir):
+    """Loading a stats file and adding one game to it, for each history size"""
+    from stats import CSVStatsManager
+    results = {}
+    for name in sizes:
+        path = os.path.join(workdir, f'history_{name}.csv')
+        write_synthetic_history(path, HISTORY_SIZES[name])
+        repeats = 3 if HISTORY_SIZES[name] <= 100000 else 1
+        results[f'stats.charger_stats.{name}'] = _measure(lambda: CSVStatsManager(path), repeats)
+        manager = CSVStatsManager(path)
+        moves = [(5, 3), (4, 3), (5, 2)]
+        results[f'stats.ajouter_partie.{name}'] = _measure(
+            lambda: manager.ajouter_partie('X', 12.5, moves), repeats)
+        # A full history file is archived and compressed in the background
+        manager.fermer()
+    return results
+
+
+def bench_visualization(sizes, workdir, repeats):
+    from stats import CSVStatsManager
+    from visualisation import StatsVisualization
+    results = {}
+    for name in sizes:
+        # A fresh history: the stats benchmarks add games dated today
+        path = os.path.join(workdir, f'figure_{name}.csv')
+        write_synthetic_history(path, HISTORY_SIZES[name])
+        visualization = StatsVisualization(CSVStatsManager(path))
+        results[f'visualisation.create_figure.{name}'] = _measure(visualization.create_figure, repeats)
+    return results
+
+
+def _run_python(arguments, workdir, frame=False):
+    """
+    Runs a new interpreter on the package, returns the time until it exits,
+    or until it prints its first line with `frame`. None if it fails.
+    """
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join(filter(None, [PACKAGE_DIR, environment.get('PYTHONPATH')]))
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable] + arguments, cwd=workdir, env=environment,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if frame:
+        line = process.stdout.readline()
+        elapsed = time.perf_counter() - start
+        process.communicate()
+        return elapsed if line.strip() == 'frame' else None
+    process.communicate()
+    elapsed = time.perf_counter() - start
+    return elapsed if process.returncode == 0 else None
+
+
+def bench_startup(workdir, repeats):
+    """
+    Importing the interface and drawing the first frame, each in a new
+    interpreter. The first frame needs a display, without one it is skipped.
+    """
+    results = {}
+    for name, arguments, frame in (('import_gui', ['-c', 'import gui'], False),
+                                   ('first_frame', ['-c', FIRST_FRAME], True)):
+        timings = [_run_python(arguments, workdir, frame) for _ in range(repeats)]
+        if None in timings:
+            print(f"startup.{name} skipped: the interpreter failed (no display?)")
+            continue
+        results[f'startup.{name}'] = {
+            'median_s': statistics.median(timings),
+            'min_s': min(timings),
+            'repeats': repeats,
+            'number': 1
+        }
+    return results
+
+
+def profile_imports(module='gui', top=20):
+    """
+    Imports `module` in a new interpreter with -X importtime and prints the
+    slowest imports, with the time of the imports they trigger included
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                             cwd=PACKAGE_DIR, capture_output=True, text=True)
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) == 3 and fields[0].strip().isdigit():
+            imports.append((int(fields[1]), int(fields[0]), fields[2].strip()))
+    if process.returncode != 0 or not imports:
+        print(process.stderr)
+        return imports
+    imports.sort(reverse=True)
+    print(f"{'module':45s} {'cumulative':>12s} {'self':>12s}")
+    for cumulative, own, name in imports[:top]:
+        print(f"{name:45s} {cumulative / 1000:9.1f} ms {own / 1000:9.1f} ms")
+    return imports
+
+
+def run_benchmarks(sizes=('1k', '100k', '1M'), repeats=5, groups=('engine', 'ai', 'solver', 'stats', 'visualisation', 'startup')):
+    """Runs the selected benchmark groups, returns the results as a dictionary"""
+    results = {}
+    previous_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            random.seed(SEED)
+            if 'engine' in groups:
+                results.update(bench_check_victory(repeats))
+            if 'ai' in groups:
+                results.update(bench_ai_levels(max(1, repeats // 2)))
+            if 'solver' in groups:
+                results.update(bench_solver(max(1, repeats // 2)))
+            if 'stats' in groups:
+                results.update(bench_stats_io(sizes, workdir))
+            if 'visualisation' in groups:
+                results.update(bench_visualization(sizes, workdir, repeats))
+            if 'startup' in groups:
+                results.update(bench_startup(workdir, repeats))
+        finally:
+            os.chdir(previous_directory)
+    return {
+        'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': SEED,
+        'results': results
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Returns the benchmarks slower than the baseline by more than `tolerance`"""
+    regressions = []
+    for name, timing in report['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None or reference['median_s'] <= 0:
+            continue
+        ratio = timing['median_s'] / reference['median_s']
+        if ratio > 1 + tolerance:
+            regressions.append((name, reference['median_s'], timing['median_s'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the engine, the AI levels and the stats I/O")
+    parser.add_argument('--sizes', default='1k,100k,1M', help="history sizes, among 1k, 100k and 1M")
+    parser.add_argument('--groups', default='engine,ai,solver,stats,visualisation,startup', help="benchmark groups to run")
+    parser.add_argument('--repeats', type=int, default=5, help="measurements per benchmark")
+    parser.add_argument('--output', default=None, help="JSON file to write the results to")
+    parser.add_argument('--baseline', default=None, help="JSON results to compare with")
+    parser.add_argument('--save-baseline', default=None, help="also write the results as a new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before failing")
+    parser.add_argument('--startup-budget', type=float, default=STARTUP_BUDGET,
+                        help="seconds allowed to launch the game and draw its first frame")
+    args = parser.parse_args()
+
+    sizes = [size for size in args.sizes.split(',') if size]
+    for size in sizes:
+        if size not in HISTORY_SIZES:
+            parser.error(f"unknown history size {size}")
+    report = run_benchmarks(sizes, args.repeats, args.groups.split(','))
+
+    for name, timing in report['results'].items():
+        note = '' if timing.get('solved', True) else '  (not solved in time)'
+        print(f"{name:45s} {timing['median_s'] * 1000:12.3f} ms{note}")
+    if any(name.startswith('solver.') for name in report['results']):
+        ply = perfect_from_ply(report['results'])
+        report['perfect_from_ply'] = ply
+        print(f"\nThe perfect level solves every corpus position from ply {ply}" if ply is not None
+              else "\nThe perfect level doesn't solve the last corpus position in time")
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    over_budget = [(name, timing['median_s']) for name, timing in report['results'].items()
+                   if name.startswith('startup.') and timing['median_s'] > args.startup_budget]
+    if over_budget:
+        print(f"\nSTARTUP OVER BUDGET ({args.startup_budget:.2f} s):")
+        for name, seconds in over_budget:
+            print(f"  {name}: {seconds:.3f} s")
+        sys.exit(1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\nREGRESSIONS (more than {args.tolerance:.0%} slower than {args.baseline}):")
+            for name, before, after, ratio in regressions:
+                print(f"  {name}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms (x{ratio:.2f})")
+            sys.exit(1)
+        print(f"\nNo regression against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
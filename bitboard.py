@@ -0,0 +1,234 @@
+import random
+from constants import *
+
+# Zobrist keys for each board geometry: one random 64-bit number per
+# (player, bit index). Seeded so that hashes are the same in every process.
+_ZOBRIST_KEYS = {}
+
+
+def zobrist_keys(rows, columns):
+    """Returns the Zobrist keys of a board geometry, built on first use"""
+    keys = _ZOBRIST_KEYS.get((rows, columns))
+    if keys is None:
+        rng = random.Random(rows * 1000 + columns)
+        size = (rows + 1) * columns
+        keys = {
+            PLAYER_X: [rng.getrandbits(64) for _ in range(size)],
+            PLAYER_O: [rng.getrandbits(64) for _ in range(size)]
+        }
+        _ZOBRIST_KEYS[(rows, columns)] = keys
+    return keys
+
+
+def completing_cells(bits, free, stride, connect=CONNECT):
+    """
+    Returns the bits of the cells of `free` that would complete an alignment
+    of `connect` tokens with the tokens of `bits`, on a board of `stride`
+    bits per column. BitBoard and Solver have an unrolled version for 4.
+    """
+    # Vertical: only the cell right above connect - 1 stacked tokens
+    cells = bits << 1
+    for k in range(2, connect):
+        cells &= bits << k
+    for shift in (stride, stride + 1, stride - 1):
+        # before[k] / after[k]: cells with k tokens right before / after them
+        # on the line, the cell completes a line with k + (connect - 1 - k)
+        before = [-1]
+        after = [-1]
+        for k in range(1, connect):
+            before.append(before[-1] & (bits << (k * shift)))
+            after.append(after[-1] & (bits >> (k * shift)))
+        for k in range(connect):
+            cells |= before[k] & after[connect - 1 - k]
+    return cells & free
+
+
+def has_alignment(bits, stride, connect=CONNECT):
+    """Returns True if `bits` contains `connect` aligned tokens"""
+    # Vertical, horizontal, diagonal / and diagonal \
+    for shift in (1, stride, stride + 1, stride - 1):
+        # Runs of `length` tokens, doubled at each step
+        run = bits
+        length = 1
+        while length < connect:
+            step = min(length, connect - length)
+            run &= run >> (step * shift)
+            length += step
+        if run:
+            return True
+    return False
+
+
+class BitBoard:
+    """
+    Connect 4 position stored as one integer bitboard per player, for any
+    board size and number of tokens to align (`connect`).
+
+    Each column takes ROWS + 1 bits: ROWS playable cells from the bottom up
+    plus one always-empty sentinel bit, so that shifted alignments never wrap
+    into the next column. The cell at `height` (0 = bottom) of `column` is bit
+    `column * (ROWS + 1) + height`.
+    """
+
+    __slots__ = ('rows', 'columns', 'connect', 'stride', 'bottom_mask', 'board_mask', 'zobrist',
+                 'bits', 'mask', 'heights', 'moves', 'move_count', 'hash')
+
+    def __init__(self, rows=ROWS, columns=COLUMNS, connect=CONNECT):
+        self.rows = rows
+        self.columns = columns
+        self.connect = connect
+        self.stride = rows + 1
+        # Bits of the bottom cell and of every playable cell of each column
+        self.bottom_mask = 0
+        for col in range(columns):
+            self.bottom_mask |= 1 << (col * self.stride)
+        self.board_mask = self.bottom_mask * ((1 << rows) - 1)
+        self.zobrist = zobrist_keys(rows, columns)
+        self.reset()
+
+    def reset(self):
+        """Empties the board"""
+        self.bits = {PLAYER_X: 0, PLAYER_O: 0}
+        self.mask = 0  # Bits of all occupied cells
+        self.heights = [0] * self.columns  # Number of tokens in each column
+        self.moves = []  # Stack of (player, column) for undo
+        self.move_count = 0
+        self.hash = 0  # Zobrist hash, updated on every play and undo
+
+    def copy(self):
+        """Returns an independent copy of the position"""
+        other = BitBoard.__new__(BitBoard)
+        other.rows = self.rows
+        other.columns = self.columns
+        other.connect = self.connect
+        other.stride = self.stride
+        other.bottom_mask = self.bottom_mask
+        other.board_mask = self.board_mask
+        other.zobrist = self.zobrist
+        other.bits = dict(self.bits)
+        other.mask = self.mask
+        other.heights = list(self.heights)
+        other.moves = list(self.moves)
+        other.move_count = self.move_count
+        other.hash = self.hash
+        return other
+
+    def can_play(self, column):
+        """Returns True if a token can be dropped in the column"""
+        return 0 <= column < self.columns and self.heights[column] < self.rows
+
+    def landing_row(self, column):
+        """Returns the board row (0 = top) where the next token would land"""
+        return self.rows - 1 - self.heights[column]
+
+    def cell_bit(self, row, column):
+        """Returns the bit of a board cell given as (row, column), row 0 = top"""
+        return 1 << (column * self.stride + self.rows - 1 - row)
+
+    def play(self, column, player):
+        """Drops a token for `player` in `column` and returns its board row"""
+        height = self.heights[column]
+        index = column * self.stride + height
+        bit = 1 << index
+        self.bits[player] |= bit
+        self.mask |= bit
+        self.heights[column] = height + 1
+        self.moves.append((player, column))
+        self.move_count += 1
+        self.hash ^= self.zobrist[player][index]
+        return self.rows - 1 - height
+
+    def undo(self):
+        """Removes the last token played and returns (player, column, row)"""
+        player, column = self.moves.pop()
+        height = self.heights[column] - 1
+        index = column * self.stride + height
+        bit = 1 << index
+        self.bits[player] &= ~bit
+        self.mask &= ~bit
+        self.heights[column] = height
+        self.move_count -= 1
+        self.hash ^= self.zobrist[player][index]
+        return player, column, self.rows - 1 - height
+
+    def get(self, row, column):
+        """Returns the content of a cell (PLAYER_X, PLAYER_O or EMPTY)"""
+        bit = self.cell_bit(row, column)
+        if self.bits[PLAYER_X] & bit:
+            return PLAYER_X
+        if self.bits[PLAYER_O] & bit:
+            return PLAYER_O
+        return EMPTY
+
+    def has_alignment(self, bits):
+        """Returns True if the given bitboard contains `connect` aligned tokens"""
+        return has_alignment(bits, self.stride, self.connect)
+
+    def has_won(self, player):
+        """Returns True if `player` has `connect` aligned tokens"""
+        return self.has_alignment(self.bits[player])
+
+    def last_move_wins(self):
+        """
+        Returns True if the last token played completes an alignment of
+        `connect` tokens.
+        Only the four lines going through that token are inspected.
+        """
+        if not self.moves:
+            return False
+        player, column = self.moves[-1]
+        bits = self.bits[player]
+        bit = 1 << (column * self.stride + self.heights[column] - 1)
+        for shift in (1, self.stride, self.stride + 1, self.stride - 1):
+            count = 1
+            # Walk both ways along the line, the sentinel bits stop the
+            # walk at the edges of the board
+            probe = bit >> shift
+            while probe & bits:
+                count += 1
+                probe >>= shift
+            probe = bit << shift
+            while probe & bits:
+                count += 1
+                probe <<= shift
+            if count >= self.connect:
+                return True
+        return False
+
+    def winning_cells(self, player):
+        """
+        Returns the bits of the empty cells that would complete an alignment
+        for `player`, whether they can be played right now or not.
+        """
+        return self.completing_cells(self.bits[player], self.mask)
+
+    def completing_cells(self, bits, mask):
+        """
+        Same as winning_cells for any set of tokens `bits` on a board whose
+        occupied cells are `mask`, e.g. to try a move without playing it.
+        """
+        if self.connect != 4:
+            return completing_cells(bits, self.board_mask ^ mask, self.stride, self.connect)
+        # Vertical: only the cell right above 3 stacked tokens
+        cells = (bits << 1) & (bits << 2) & (bits << 3)
+        for shift in (self.stride, self.stride + 1, self.stride - 1):
+            # Two tokens on one side plus a third on either end
+            pair = (bits << shift) & (bits << (2 * shift))
+            cells |= pair & (bits << (3 * shift))
+            cells |= pair & (bits >> shift)
+            pair = (bits >> shift) & (bits >> (2 * shift))
+            cells |= pair & (bits << shift)
+            cells |= pair & (bits >> (3 * shift))
+        return cells & (self.board_mask ^ mask)
+
+    def move_bit(self, column):
+        """Returns the bit of the cell where a token dropped in `column` lands"""
+        return 1 << (column * self.stride + self.heights[column])
+
+    def playable_cells(self):
+        """Returns the bits of the cells where the next tokens would land"""
+        return (self.mask + self.bottom_mask) & self.board_mask
+
+    def is_full(self):
+        """Returns True if every cell is occupied"""
+        return self.move_count == self.rows * self.columns
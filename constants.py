@@ -1,6 +1,7 @@
 # Game constants
 ROWS = 6
 COLUMNS = 7
+CONNECT = 4  # Number of aligned tokens needed to win
 CELL_SIZE = 80
 
 # Players
@@ -8,6 +9,32 @@ PLAYER_X = 'X'
 PLAYER_O = 'O'
 EMPTY = ' '
 
+# AI
+AI_TIME_LIMIT = 1.0  # Thinking time of the expert AI, in seconds per move
+TT_SIZE_MB = 16  # Memory budget of the transposition table
+TT_REPLACEMENT = 'depth'  # Replacement policy: 'always', 'depth' or 'age'
+OPENING_BOOK_FILE = 'opening_book.bin'  # Built with opening_book.py
+SOLVER_TIME_LIMIT = 1.0  # Beyond this time the perfect AI falls back to the book, then the search
+SOLVER_TABLE_SIZE = 1000003  # Slots of the solver transposition table (prime)
+SEARCH_WORKERS = 1  # Processes of the expert search, 1 keeps it in the game process
+MCTS_BATCH_SIZE = 64  # Random games played at once from each new tree node
+MCTS_EXPLORATION = 1.4  # UCT exploration constant
+PATTERN_HALF_LIFE = None  # Won games after which the learned patterns are halved, None keeps them all
+PONDER_CPU_SHARE = 0.5  # Share of the time the AI may think during the human's turn
+PONDER_MAX_POSITIONS = 64  # Replies kept by the pondering, at most
+AI_MOVE_DELAY = 100  # Delay before the AI answers a human move, in milliseconds
+AI_POLL_INTERVAL = 20  # How often the interface checks for the AI move, in milliseconds
+AI_CANCEL_TIMEOUT = 2.0  # Longest wait for a cancelled AI move before the interface goes on, in seconds
+STARTUP_BUDGET = 1.0  # Time from launching main.py to the first frame, in seconds (see benchmark.py)
+
+# Statistics
+STATS_BACKEND = 'csv'  # Stats storage: 'csv' (stats.csv), 'binary' (stats.c4r, see records.py) or 'sqlite' (stats.db)
+STATS_APPEND_ONLY = True  # Games are appended to the stats file instead of rewriting it
+STATS_FSYNC = 'interval'  # When appended games are forced to disk: 'always', 'interval' or 'never'
+STATS_FSYNC_INTERVAL = 5.0  # Seconds between two fsync with the 'interval' policy
+STATS_COMMIT_BATCH = 100  # Games added to the SQLite stats before a commit is forced
+STATS_SEGMENT_ROWS = 100000  # Games per stats file before it is archived and compressed (None: never)
+
 # Colors
 COLORS = {
     'background': '#1E1E1E',
@@ -1,39 +1,110 @@
+import copy
 import time
 import random
 import json
+import threading
 from datetime import datetime
 from constants import *
-# Use the CSVStatsManager from stats.py with the correct method name
-from stats import CSVStatsManager
+from lines import line_table, HORIZONTAL
+from position import Position
+from search import NegamaxSearch
+from transposition import TranspositionTable
+from opening_book import OpeningBook
+from solver import Solver, SolverTimeout
+from mcts import MCTS
+from parallel_search import RootParallelSearch
+from ponder import Ponderer
+from vectorized_eval import VectorizedEvaluator
+from patterns import LearnedPatterns
+from stats import creer_stats_manager
+from instrumentation import Instrumentation
 
 class Connect4:
-    def __init__(self):
+    def __init__(self, rows=ROWS, columns=COLUMNS, connect=CONNECT, learned_patterns=None):
+        # Board geometry and number of aligned tokens needed to win
+        self.rows = rows
+        self.columns = columns
+        self.connect = connect
         # Initialize the game state
         self.scores = {PLAYER_X: 0, PLAYER_O: 0}
         self.ai_mode = False
         self.ai_vs_ai_mode = False
-        self.ai_level = 1  # Default AI level: 1 = moderate, 2 = advanced
-        # Update to use CSVStatsManager
-        self.stats_manager = CSVStatsManager()
+        self.ai_level = 1  # Default AI level: 1 = moderate, 2 = advanced, 3 = expert, 4 = perfect, 5 = MCTS
+        # Winning lines of the board, plus the alignments of connect - 1 and 2
+        # tokens counted by the evaluation functions
+        self.lines = line_table(rows, columns, connect)
+        self.triples = line_table(rows, columns, connect - 1).lines_in_direction(HORIZONTAL)
+        self.pairs = line_table(rows, columns, 2).lines
+        # Center columns first, 1 point for the edges
+        self.center_preference = [(columns + 1) // 2 - abs(2 * col - (columns - 1)) // 2
+                                  for col in range(columns)]
+        # Search used by the expert level, limited to AI_TIME_LIMIT per move.
+        # The transposition table is kept from one move to the next.
+        self.transposition_table = TranspositionTable(TT_SIZE_MB, TT_REPLACEMENT)
+        self.search = NegamaxSearch(time_limit=AI_TIME_LIMIT, table=self.transposition_table)
+        # With SEARCH_WORKERS > 1 the expert search is split across processes
+        self.parallel_search = None
+        if SEARCH_WORKERS > 1:
+            self.parallel_search = RootParallelSearch(SEARCH_WORKERS, AI_TIME_LIMIT)
+        # Expert replies searched in the background during the human's turn
+        self.ponderer = Ponderer(self.transposition_table)
+        # Perfect-play solver, also used as an oracle to grade the other levels
+        self.solver = Solver(rows, columns, connect, time_limit=SOLVER_TIME_LIMIT)
+        # Monte Carlo tree search, its tree is reused from one move to the next.
+        # Its playouts need a board that fits in 64 bits, on larger boards
+        # the MCTS level plays expert moves instead.
+        self.mcts = None
+        if (rows + 1) * columns <= 64:
+            self.mcts = MCTS(time_limit=AI_TIME_LIMIT)
+        # Set by the interface to stop the AI move in progress: the searches
+        # then return at once with their best move so far
+        self.ai_cancel = threading.Event()
+        self.search.cancel = self.ai_cancel
+        self.solver.cancel = self.ai_cancel
+        if self.parallel_search is not None:
+            self.parallel_search.cancel = self.ai_cancel
+        if self.mcts is not None:
+            self.mcts.cancel = self.ai_cancel
+        # Scores all the candidate moves of the advanced level at once
+        self.move_evaluator = VectorizedEvaluator(rows, columns, connect)
+        # Precomputed opening moves (None if the book file hasn't been built)
+        self.opening_book = OpeningBook.load(OPENING_BOOK_FILE)
+        # Counters read by the instrumentation: they are cheap enough to be
+        # always updated, the per-decision records are only kept when
+        # enable_instrumentation() has been called
+        self.instrumentation = None
+        self.victory_checks = 0
+        self.positions_evaluated = 0
+        self.decision_branch = None  # Strategy that decided the last AI move
+        self.decision_depth = 0  # Search depth reached by the last AI move
+        self.cache_hits = 0
         self.start_time = time.time()
         self.game_moves = []  # To record moves of the current game
-        # Immediately load patterns learned from previous games
-        try:
-            self.learned_patterns = self.stats_manager.analyser_historique_victoires()
-        except Exception as e:
-            print(f"Error loading learned patterns: {e}")
-            self.learned_patterns = {
-                'X': {'coups': [], 'frequence': {}},
-                'O': {'coups': [], 'frequence': {}}
-            }
+        if learned_patterns is not None:
+            # Patterns given by the caller (the self-play workers): the stats
+            # file isn't opened and the games aren't recorded
+            self.stats_manager = None
+            self.learned_patterns = learned_patterns
+        else:
+            # Stats file in the format chosen by STATS_BACKEND
+            self.stats_manager = creer_stats_manager(rows, columns, connect)
+            # Immediately load patterns learned from previous games
+            try:
+                self.learned_patterns = self.stats_manager.analyser_historique_victoires(rows, columns)
+            except Exception as e:
+                print(f"Error loading learned patterns: {e}")
+                self.learned_patterns = LearnedPatterns(rows, columns)
         self.reset_game()
 
     def reset_game(self):
-        # Create an empty board
-        self.board = []
-        for _ in range(ROWS):
-            row = [EMPTY] * COLUMNS
-            self.board.append(row)
+        # Create an empty board. The bitboard is the engine used for all the
+        # game logic, the threat map keeps the winning cells of both players
+        # and self.board mirrors it as a grid for the interface. All three
+        # belong to the position, updated by _play_token/_undo_token.
+        self.position = Position(self.rows, self.columns, self.connect)
+        self.bitboard = self.position.bitboard
+        self.threats = self.position.threats
+        self.board = self.position.grid
         
         # Initialize game state
         self.current_player = PLAYER_X
@@ -41,6 +112,9 @@ class Connect4:
         if not hasattr(self, 'start_time') or self.start_time is None:
             self.start_time = time.time()
         self.game_moves = []  # Reset moves of the current game
+        self.ponderer.clear()
+        if getattr(self, 'instrumentation', None) is not None:
+            self.instrumentation.new_game()
 
     def place_token(self, column):
         """Place a token in the specified column"""
@@ -48,100 +122,66 @@ class Connect4:
         if not hasattr(self, 'start_time') or self.start_time is None:
             self.start_time = time.time()
             
-        if column < 0 or column >= COLUMNS:
+        if not self.bitboard.can_play(column):
             return False
             
-        for row in range(ROWS-1, -1, -1):
-            if self.board[row][column] == EMPTY:
-                self.board[row][column] = self.current_player
-                # Record the move
-                self.game_moves.append((row, column))
-                
-                # Check if this move leads to a victory
-                if self.check_victory():
-                    return 'victory'
-                    
-                # Check if the board is full
-                if self.is_board_full():
-                    return 'draw'
-                    
-                return True
-                
-        return False
+        row = self._play_token(column, self.current_player)
+        # Record the move
+        self.game_moves.append((row, column))
+        
+        # Check if this move leads to a victory
+        if self.check_last_move_victory():
+            return 'victory'
+            
+        # Check if the board is full
+        if self.is_board_full():
+            return 'draw'
+            
+        return True
+
+    def undo_move(self):
+        """Cancels the last move played with place_token"""
+        if not self.game_moves:
+            return False
+        self._undo_token()
+        self.game_moves.pop()
+        return True
+
+    def _play_token(self, column, player):
+        """Drops a token on the position, returns the row"""
+        return self.position.make(column, player)
+
+    def _undo_token(self):
+        """Removes the last token dropped with _play_token"""
+        self.position.unmake()
 
     def check_victory(self):
-        # Horizontal check
-        for row in range(ROWS):
-            for col in range(COLUMNS - 3):
-                if (self.board[row][col] != EMPTY and
-                    self.board[row][col] == self.board[row][col + 1] == 
-                    self.board[row][col + 2] == self.board[row][col + 3]):
-                    return True
-
-        # Vertical check
-        for row in range(ROWS - 3):
-            for col in range(COLUMNS):
-                if (self.board[row][col] != EMPTY and
-                    self.board[row][col] == self.board[row + 1][col] == 
-                    self.board[row + 2][col] == self.board[row + 3][col]):
-                    return True
-
-        # Diagonal check (/)
-        for row in range(3, ROWS):
-            for col in range(COLUMNS - 3):
-                if (self.board[row][col] != EMPTY and
-                    self.board[row][col] == self.board[row - 1][col + 1] == 
-                    self.board[row - 2][col + 2] == self.board[row - 3][col + 3]):
-                    return True
-
-        # Diagonal check (\)
-        for row in range(ROWS - 3):
-            for col in range(COLUMNS - 3):
-                if (self.board[row][col] != EMPTY and
-                    self.board[row][col] == self.board[row + 1][col + 1] == 
-                    self.board[row + 2][col + 2] == self.board[row + 3][col + 3]):
-                    return True
-
-        return False
+        self.victory_checks += 1
+        bits_x = self.bitboard.bits[PLAYER_X]
+        bits_o = self.bitboard.bits[PLAYER_O]
+        return any(bits_x & mask == mask or bits_o & mask == mask for mask in self.lines.masks)
 
-    def find_winning_tokens(self):
-        """Returns the coordinates of the 4 winning tokens"""
-        # Horizontal check
-        for row in range(ROWS):
-            for col in range(COLUMNS - 3):
-                if (self.board[row][col] != EMPTY and
-                    self.board[row][col] == self.board[row][col + 1] == 
-                    self.board[row][col + 2] == self.board[row][col + 3]):
-                    return [(row, col + i) for i in range(4)]
-
-        # Vertical check
-        for row in range(ROWS - 3):
-            for col in range(COLUMNS):
-                if (self.board[row][col] != EMPTY and
-                    self.board[row][col] == self.board[row + 1][col] == 
-                    self.board[row + 2][col] == self.board[row + 3][col]):
-                    return [(row + i, col) for i in range(4)]
-
-        # Diagonal check (/)
-        for row in range(3, ROWS):
-            for col in range(COLUMNS - 3):
-                if (self.board[row][col] != EMPTY and
-                    self.board[row][col] == self.board[row - 1][col + 1] == 
-                    self.board[row - 2][col + 2] == self.board[row - 3][col + 3]):
-                    return [(row - i, col + i) for i in range(4)]
-
-        # Diagonal check (\)
-        for row in range(ROWS - 3):
-            for col in range(COLUMNS - 3):
-                if (self.board[row][col] != EMPTY and
-                    self.board[row][col] == self.board[row + 1][col + 1] == 
-                    self.board[row + 2][col + 2] == self.board[row + 3][col + 3]):
-                    return [(row + i, col + i) for i in range(4)]
+    def check_last_move_victory(self):
+        """Checks only the lines going through the last token played"""
+        self.victory_checks += 1
+        return self.bitboard.last_move_wins()
 
+    def find_winning_tokens(self):
+        """Returns the coordinates of the winning tokens of the last move"""
+        if not self.bitboard.moves:
+            return []
+        player, column = self.bitboard.moves[-1]
+        row = self.rows - self.bitboard.heights[column]
+        bits = self.bitboard.bits[player]
+        # Only the lines going through the last token can have been completed
+        for index in self.lines.cell_lines[row][column]:
+            mask = self.lines.masks[index]
+            if bits & mask == mask:
+                return list(self.lines.lines[index])
         return []
 
     def is_board_full(self):
-        return all(cell != EMPTY for row in self.board for cell in row)
+        return self.bitboard.is_full()
 
     def change_player(self):
         self.current_player = PLAYER_O if self.current_player == PLAYER_X else PLAYER_X
@@ -152,69 +192,57 @@ class Connect4:
 
     def evaluate_move(self, column):
         """Evaluates a potential move"""
-        # Save the current state including start_time
-        start_time_backup = self.start_time
-        current_player_backup = self.current_player
-        
-        if not self.place_token(column):
-            self.start_time = start_time_backup  # Restore start_time
+        # The move is tried on the position only, the session state (timer,
+        # moves of the game, player to move) is left untouched
+        if not self.position.can_play(column):
             return float('-inf')
-            
-        score = 0
-        self.change_player()
+        self.position.make(column, self.current_player)
         
         # Check if the move leads to a victory
-        if self.check_victory():
+        if self.check_last_move_victory():
             score = 100
         else:
-            # Evaluate the position
-            score = self.evaluate_position()
+            # Evaluate the position from the opponent's point of view
+            opponent = PLAYER_X if self.current_player == PLAYER_O else PLAYER_O
+            score = self.evaluate_position(opponent)
             
         # Undo the move
-        for row in range(ROWS):
-            if self.board[row][column] != EMPTY:
-                self.board[row][column] = EMPTY
-                break
-                
-        # IMPORTANT: Restore the original state including start_time
-        self.start_time = start_time_backup
-        self.current_player = current_player_backup
-        
+        self.position.unmake()
         return score
 
-    def evaluate_position(self):
-        """Evaluates the current board position using learned patterns"""
+    def evaluate_position(self, player=None):
+        """Evaluates the board position for `player` (the current player by default) using learned patterns"""
+        if player is None:
+            player = self.current_player
+        self.positions_evaluated += 1
         score = 0
         
         # Basic evaluation
-        score += self._evaluate_base_position()
+        score += self._evaluate_base_position(player)
         
         # Bonus for learned patterns
         if self.learned_patterns:
-            score += self._evaluate_learned_patterns()
+            score += self._evaluate_learned_patterns(player)
         
         return score
 
-    def _evaluate_base_position(self):
+    def _evaluate_base_position(self, player):
         """Basic evaluation of the position"""
         score = 0
         # Center of the board (priority)
-        center = COLUMNS // 2
-        for row in range(ROWS):
-            if self.board[row][center] == self.current_player:
+        center = self.columns // 2
+        for row in range(self.rows):
+            if self.board[row][center] == player:
                 score += 3
                 
-        # Check for alignments of 3
-        for row in range(ROWS):
-            for col in range(COLUMNS-2):
-                if (self.board[row][col] == self.current_player and
-                    self.board[row][col+1] == self.current_player and
-                    self.board[row][col+2] == self.current_player):
-                    score += 5
+        # Check for horizontal alignments of connect - 1 (3 in Connect 4)
+        for line in self.triples:
+            if all(self.board[row][col] == player for row, col in line):
+                score += 5
                     
         return score
 
-    def _evaluate_learned_patterns(self):
+    def _evaluate_learned_patterns(self, player):
         """Evaluates the position based on learned patterns"""
         score = 0
         patterns = self.learned_patterns
@@ -223,54 +251,90 @@ class Connect4:
             return score
             
         # Check if the current position matches known winning patterns
-        for row in range(ROWS):
-            for col in range(COLUMNS):
-                if self.board[row][col] == self.current_player:
-                    pos = str((row, col))
+        opponent = 'X' if player == 'O' else 'O'
+        own = patterns.counts[player]
+        other = patterns.counts[opponent]
+        for row in range(self.rows):
+            for col in range(self.columns):
+                if self.board[row][col] == player:
                     # Bonus based on pattern frequency
-                    if self.current_player in patterns and pos in patterns[self.current_player]['frequence']:
-                        bonus = patterns[self.current_player]['frequence'][pos] * 0.5
-                        score += bonus
-                        
+                    score += int(own[row, col]) * 0.5
                     # Penalty if position is often winning for opponent
-                    opponent = 'X' if self.current_player == 'O' else 'O'
-                    if opponent in patterns and pos in patterns[opponent]['frequence']:
-                        penalty = patterns[opponent]['frequence'][pos] * 0.8
-                        score -= penalty
+                    score -= int(other[row, col]) * 0.8
                         
-        # Check partial alignments that often lead to victories
-        for row in range(ROWS-1):
-            for col in range(COLUMNS-1):
-                if (self.board[row][col] == self.current_player and 
-                    self.board[row+1][col] == self.current_player):
-                    # Vertical alignment of 2
-                    score += 2
-                    
-                if (col < COLUMNS-2 and self.board[row][col] == self.current_player and 
-                    self.board[row][col+1] == self.current_player):
-                    # Horizontal alignment of 2
-                    score += 2
-                    
-                if (row < ROWS-2 and col < COLUMNS-2 and 
-                    self.board[row][col] == self.current_player and 
-                    self.board[row+1][col+1] == self.current_player):
-                    # Diagonal \ alignment of 2
-                    score += 2
-                    
-                if (row > 0 and col < COLUMNS-2 and row < ROWS-1 and
-                    self.board[row][col] == self.current_player and 
-                    self.board[row-1][col+1] == self.current_player):
-                    # Diagonal / alignment of 2
-                    score += 2
+        # Check partial alignments that often lead to victories: pairs of
+        # tokens, vertical, horizontal or diagonal
+        for (row1, col1), (row2, col2) in self.pairs:
+            if (self.board[row1][col1] == player and
+                self.board[row2][col2] == player):
+                score += 2
         
         return score
 
     def choose_best_move(self):
         """Chooses the best move for the AI based on the AI level"""
+        if self.instrumentation is None:
+            return self._choose_move()
+        return self.instrumentation.record(self, self._choose_move)
+
+    def snapshot(self):
+        """
+        Copy of the game with its own position, sharing everything else (AI
+        levels, tables, learned patterns). The interface chooses the AI move
+        on a snapshot in a worker thread: it can keep reading the board in
+        the meantime, and a cancelled move still running can't touch the
+        position of the next game.
+        """
+        other = copy.copy(self)
+        other.position = self.position.copy()
+        other.bitboard = other.position.bitboard
+        other.threats = other.position.threats
+        other.board = other.position.grid
+        other.game_moves = list(self.game_moves)
+        return other
+
+    def start_pondering(self):
+        """
+        Starts searching the AI replies to the possible moves of the current
+        player, a human playing against the expert level
+        """
+        if self.ai_level == 3:
+            self.ponderer.start(self.bitboard, self.current_player, self.search)
+
+    def stop_pondering(self):
+        """Cancels the background search, must be called before the board changes"""
+        self.ponderer.stop()
+
+    def enable_instrumentation(self):
+        """Starts recording the cost of every AI decision, returns the recorder"""
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation()
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        self.instrumentation = None
+
+    def _choose_move(self):
+        self.decision_branch = None
+        self.decision_depth = 0
+        # Opening positions are answered by the book, except at the moderate
+        # level which keeps its own simple logic, and at the perfect level:
+        # the book moves come from a short search, not from solved positions
+        if self.ai_level >= 2 and self.ai_level != 4:
+            column = self._book_move()
+            if column is not None:
+                return column
+            
         if self.ai_level == 1:
             return self._choose_moderate_move()  # Niveau modéré - logique de base
-        else:
+        elif self.ai_level == 2:
             return self._choose_advanced_move()  # Niveau avancé - avec analyse des parties
+        elif self.ai_level == 3:
+            return self._choose_expert_move()  # Niveau expert - recherche alpha-beta
+        elif self.ai_level == 4:
+            return self._choose_perfect_move()  # Niveau parfait - résolution exacte
+        else:
+            return self._choose_mcts_move()  # Niveau MCTS - parties aléatoires simulées
             
     def _choose_moderate_move(self):
         """
@@ -278,46 +342,27 @@ class Connect4:
         This AI uses a simpler approach without learning from past games.
         """
         # If it's the first time we play, priority to the center
-        if len(self.game_moves) <= 2 and self.board[0][COLUMNS // 2] == EMPTY:
-            return COLUMNS // 2
+        if len(self.game_moves) <= 2 and self.bitboard.can_play(self.columns // 2):
+            self.decision_branch = 'opening'
+            return self.columns // 2
             
         # Check if a move allows to win immediately
-        for col in range(COLUMNS):
-            if self.board[0][col] == EMPTY:  # If the column is not full
-                # Simulate the move to see if it leads to a victory
-                for row in range(ROWS-1, -1, -1):
-                    if self.board[row][col] == EMPTY:
-                        self.board[row][col] = self.current_player
-                        victory = self.check_victory()
-                        self.board[row][col] = EMPTY  # Undo the move
-                        if victory:
-                            return col
+        winning_columns = self.threats.winning_columns(self.current_player)
+        if winning_columns:
+            self.decision_branch = 'immediate_win'
+            return min(winning_columns)
 
         # Check if the opponent can win on the next move and block
         opponent = PLAYER_X if self.current_player == PLAYER_O else PLAYER_O
-        current_player_backup = self.current_player
-        self.current_player = opponent  # Temporarily change to simulate
-        
-        for col in range(COLUMNS):
-            if self.board[0][col] == EMPTY:  # If the column is not full
-                # Simulate the opponent's move to see if it leads to a victory
-                for row in range(ROWS-1, -1, -1):
-                    if self.board[row][col] == EMPTY:
-                        self.board[row][col] = opponent
-                        opponent_victory = self.check_victory()
-                        self.board[row][col] = EMPTY  # Undo the move
-                        if opponent_victory:
-                            self.current_player = current_player_backup  # Restore
-                            return col
-                        break
-        
-        # Restore the current player
-        self.current_player = current_player_backup
+        blocking_columns = self.threats.winning_columns(opponent)
+        if blocking_columns:
+            self.decision_branch = 'block'
+            return min(blocking_columns)
         
         # If no obvious move, use basic evaluation (without patterns)
         evaluations = {}
-        for col in range(COLUMNS):
-            if self.board[0][col] == EMPTY:  # If the column is not full
+        for col in range(self.columns):
+            if self.bitboard.can_play(col):  # If the column is not full
                 # Use a simplified evaluation that only considers basic position
                 score = self._evaluate_basic_position(col)
                 evaluations[col] = score
@@ -333,11 +378,13 @@ class Connect4:
         
         # Choose randomly among the best moves with some randomness for moderate difficulty
         if random.random() < 0.2:  # 20% of the time, pick a random valid move
-            valid_moves = [col for col in range(COLUMNS) if self.board[0][col] == EMPTY]
+            valid_moves = [col for col in range(self.columns) if self.bitboard.can_play(col)]
             if valid_moves:
+                self.decision_branch = 'random'
                 return random.choice(valid_moves)
         
         # Otherwise choose among the best moves
+        self.decision_branch = 'evaluation'
         return random.choice(best_moves) if best_moves else None
 
     def _evaluate_basic_position(self, column):
@@ -345,83 +392,48 @@ class Connect4:
         Simplified evaluation for the moderate AI level.
         Only considers basic strategy without pattern learning.
         """
-        # Save the current state
-        start_time_backup = self.start_time
-        current_player_backup = self.current_player
-        
         # Try to place the token
-        placement_row = -1
-        for row in range(ROWS-1, -1, -1):
-            if self.board[row][column] == EMPTY:
-                placement_row = row
-                self.board[row][column] = self.current_player
-                break
-                
-        if placement_row == -1:
+        if not self.position.can_play(column):
             # Column is full
             return float('-inf')
+        self.positions_evaluated += 1
+        placement_row = self.position.make(column, self.current_player)
             
         score = 0
         
-        # Check if this creates any potential alignments
-        
-        # Check horizontal potential (how many tokens could be aligned)
-        for c in range(max(0, column-3), min(COLUMNS-3, column+1)):
-            window = [self.board[placement_row][c+i] for i in range(4)]
-            score += self._evaluate_window(window)
-            
-        # Check vertical potential
-        if placement_row <= ROWS-4:
-            window = [self.board[placement_row+i][column] for i in range(4)]
-            score += self._evaluate_window(window)
-            
-        # Check diagonal potentials
-        # Diagonal \
-        for r, c in zip(range(max(0, placement_row-3), min(ROWS-3, placement_row+1)), 
-                         range(max(0, column-3), min(COLUMNS-3, column+1))):
-            window = [self.board[r+i][c+i] for i in range(4)]
-            score += self._evaluate_window(window)
-            
-        # Diagonal /
-        for r, c in zip(range(min(ROWS-1, placement_row+3), max(3, placement_row), -1),
-                         range(max(0, column-3), min(COLUMNS-3, column+1))):
-            window = [self.board[r-i][c+i] for i in range(4)]
-            score += self._evaluate_window(window)
+        # Check the potential of every line going through the new token
+        for index in self.lines.cell_lines[placement_row][column]:
+            window = [self.board[row][col] for row, col in self.lines.lines[index]]
+            score += self._evaluate_window(window, self.current_player)
         
         # Prefer center columns
-        center_preference = [1, 2, 3, 4, 3, 2, 1]  # Higher values for central columns
-        score += center_preference[column]
+        score += self.center_preference[column]
         
         # Undo the move
-        self.board[placement_row][column] = EMPTY
-        
-        # Restore original state
-        self.start_time = start_time_backup
-        self.current_player = current_player_backup
-        
+        self.position.unmake()
         return score
         
-    def _evaluate_window(self, window):
+    def _evaluate_window(self, window, player):
         """
-        Helper function to evaluate a window of 4 positions.
+        Helper function to evaluate a window of `connect` positions.
         Used by the moderate AI level.
         """
         score = 0
         # Count player tokens and empty spaces
-        player_count = window.count(self.current_player)
+        player_count = window.count(player)
         empty_count = window.count(EMPTY)
-        opponent = PLAYER_X if self.current_player == PLAYER_O else PLAYER_O
+        opponent = PLAYER_X if player == PLAYER_O else PLAYER_O
         opponent_count = window.count(opponent)
         
-        if player_count == 4:
+        if player_count == self.connect:
             score += 100  # Winning move
-        elif player_count == 3 and empty_count == 1:
+        elif player_count == self.connect - 1 and empty_count == 1:
             score += 5  # Good potential
-        elif player_count == 2 and empty_count == 2:
+        elif player_count == self.connect - 2 and empty_count == 2:
             score += 2  # Some potential
             
         # Prevent opponent from winning
-        if opponent_count == 3 and empty_count == 1:
+        if opponent_count == self.connect - 1 and empty_count == 1:
             score -= 10  # Block opponent's potential win
             
         return score
@@ -432,41 +444,22 @@ class Connect4:
         This AI uses all available information including past game data.
         """
         # If it's the first time we play, priority to the center
-        if len(self.game_moves) <= 2 and self.board[0][COLUMNS // 2] == EMPTY:
-            return COLUMNS // 2
+        if len(self.game_moves) <= 2 and self.bitboard.can_play(self.columns // 2):
+            self.decision_branch = 'opening'
+            return self.columns // 2
             
         # Check if a move allows to win immediately
-        for col in range(COLUMNS):
-            if self.board[0][col] == EMPTY:  # If the column is not full
-                # Simulate the move to see if it leads to a victory
-                for row in range(ROWS-1, -1, -1):
-                    if self.board[row][col] == EMPTY:
-                        self.board[row][col] = self.current_player
-                        victory = self.check_victory()
-                        self.board[row][col] = EMPTY  # Undo the move
-                        if victory:
-                            return col
+        winning_columns = self.threats.winning_columns(self.current_player)
+        if winning_columns:
+            self.decision_branch = 'immediate_win'
+            return min(winning_columns)
 
         # Check if the opponent can win on the next move and block
         opponent = PLAYER_X if self.current_player == PLAYER_O else PLAYER_O
-        current_player_backup = self.current_player
-        self.current_player = opponent  # Temporarily change to simulate
-        
-        for col in range(COLUMNS):
-            if self.board[0][col] == EMPTY:  # If the column is not full
-                # Simulate the opponent's move to see if it leads to a victory
-                for row in range(ROWS-1, -1, -1):
-                    if self.board[row][col] == EMPTY:
-                        self.board[row][col] = opponent
-                        opponent_victory = self.check_victory()
-                        self.board[row][col] = EMPTY  # Undo the move
-                        if opponent_victory:
-                            self.current_player = current_player_backup  # Restore
-                            return col
-                        break
-        
-        # Restore the current player
-        self.current_player = current_player_backup
+        blocking_columns = self.threats.winning_columns(opponent)
+        if blocking_columns:
+            self.decision_branch = 'block'
+            return min(blocking_columns)
         
         # Analyze repetitive moves of the player
         player_moves = [move for i, move in enumerate(self.game_moves) if i % 2 == 0]  # Player moves (even)
@@ -474,7 +467,7 @@ class Connect4:
             last_moves_columns = [col for _, col in player_moves[-3:]]
             # If the player has played in the same column 2 or more times in the last 3 moves
             repeated_column = None
-            for col in range(COLUMNS):
+            for col in range(self.columns):
                 if last_moves_columns.count(col) >= 2:
                     repeated_column = col
                     break
@@ -482,48 +475,36 @@ class Connect4:
             if repeated_column is not None:
                 # Check if we can block this column or play right next to it
                 for col in [repeated_column-1, repeated_column+1, repeated_column]:
-                    if 0 <= col < COLUMNS and self.board[0][col] == EMPTY:
+                    if self.bitboard.can_play(col):
                         # Check if this move is safe (doesn't give a victory to the opponent)
                         if not self.move_gives_opponent_victory(col):
+                            self.decision_branch = 'repetition'
                             return col
         
         # Use learned patterns for evaluation
         if self.learned_patterns:
             pattern_opponent = 'X' if self.current_player == 'O' else 'O'
-            if pattern_opponent in self.learned_patterns and self.learned_patterns[pattern_opponent]['frequence']:
-                # Identify positions frequently used by the opponent
-                frequent_positions = sorted(
-                    self.learned_patterns[pattern_opponent]['frequence'].items(),
-                    key=lambda x: x[1],
-                    reverse=True
-                )[:5]  # Top 5 positions
-                
+            # Identify positions frequently used by the opponent (top 5)
+            frequent_positions = self.learned_patterns.top_positions(pattern_opponent, 5)
+            if frequent_positions:
                 # Identify preferred columns of the opponent
                 frequent_columns = {}
-                for pos_str, freq in frequent_positions:
-                    try:
-                        # Extract the column from the position (format: "(row, column)")
-                        import ast
-                        pos = ast.literal_eval(pos_str)
-                        if isinstance(pos, tuple) and len(pos) == 2:
-                            _, col = pos
-                            if 0 <= col < COLUMNS:
-                                frequent_columns[col] = frequent_columns.get(col, 0) + freq
-                    except:
-                        continue
+                for (_, col), freq in frequent_positions:
+                    frequent_columns[col] = frequent_columns.get(col, 0) + freq
                 
                 # If we have identified frequent columns, try to block them
                 if frequent_columns:
                     preferred_column = max(frequent_columns.items(), key=lambda x: x[1])[0]
-                    if self.board[0][preferred_column] == EMPTY and not self.move_gives_opponent_victory(preferred_column):
+                    if self.bitboard.can_play(preferred_column) and not self.move_gives_opponent_victory(preferred_column):
+                        self.decision_branch = 'pattern'
                         return preferred_column
         
         # If no specific strategy was used, use advanced evaluation with learned patterns
-        evaluations = {}
-        for col in range(COLUMNS):
-            if self.board[0][col] == EMPTY:  # If the column is not full
-                score = self.evaluate_move(col)
-                evaluations[col] = score
+        # (same scores as evaluate_move, computed for all the columns in one pass)
+        evaluations = self.move_evaluator.evaluate_moves(
+            self.bitboard, self.current_player, self.learned_patterns)
+        self.positions_evaluated += len(evaluations)
+        self.decision_branch = 'evaluation'
                 
         # Find the best score
         if not evaluations:
@@ -537,40 +518,88 @@ class Connect4:
         # Choose randomly among the best moves
         return random.choice(best_moves) if best_moves else None
 
+    def _choose_expert_move(self):
+        """
+        Chooses the best move with a negamax search (expert level).
+        The search deepens until its time budget is spent, so the thinking
+        time stays predictable whatever the position.
+        """
+        # The human played a move whose reply was pondered
+        column = self.ponderer.lookup(self.bitboard)
+        if column is not None:
+            self.decision_branch = 'ponder'
+            return column
+        self.decision_branch = 'search'
+        search = self.parallel_search if self.parallel_search is not None else self.search
+        column = search.search(self.bitboard, self.current_player)
+        self.positions_evaluated += search.nodes
+        self.cache_hits += search.table_hits
+        self.decision_depth = search.depth_reached
+        return column
+
+    def _book_move(self):
+        """The move of the opening book for the position, or None"""
+        if self.opening_book is None:
+            return None
+        column = self.opening_book.lookup(self.bitboard)
+        if column is not None:
+            self.decision_branch = 'book'
+        return column
+
+    def _choose_perfect_move(self):
+        """
+        Chooses an optimal move with the solver (perfect level).
+        Early positions can take too long to solve: past SOLVER_TIME_LIMIT
+        the book, then the expert search picks the move instead. Only the
+        moves of the 'solver' branch are exact, which with the default limit
+        means from about ply 16 on 6x7 (see the solver group of benchmark.py).
+        """
+        try:
+            column = self.solver.analyze(self.bitboard, self.current_player)['move']
+            self.decision_branch = 'solver'
+            return column
+        except SolverTimeout:
+            column = self._book_move()
+            if column is not None:
+                return column
+            return self._choose_expert_move()
+        finally:
+            self.positions_evaluated += self.solver.nodes
+            self.cache_hits += self.solver.hits
+
+    def _choose_mcts_move(self):
+        """
+        Chooses the move with a Monte Carlo tree search (MCTS level).
+        The number of random games simulated per second is available in
+        self.mcts.last_stats after each move.
+        """
+        if self.mcts is None:
+            return self._choose_expert_move()
+        column = self.mcts.search(self.bitboard, self.current_player)
+        self.decision_branch = 'mcts'
+        self.positions_evaluated += self.mcts.last_stats.get('playouts', 0)
+        return column
+
+    def solve_position(self):
+        """
+        Returns the game-theoretic value of the current position for the
+        player to move: result ('win', 'loss' or 'draw'), distance in plies,
+        score and optimal column. Unlike the perfect level, no time limit
+        applies, so early positions can take a long time to solve.
+        """
+        time_limit = self.solver.time_limit
+        self.solver.time_limit = None
+        try:
+            return self.solver.analyze(self.bitboard, self.current_player)
+        finally:
+            self.solver.time_limit = time_limit
+
     def move_gives_opponent_victory(self, column):
         """Check if playing in this column allows the opponent to win on the next move"""
-        if column < 0 or column >= COLUMNS or self.board[0][column] != EMPTY:
-            return True  # Invalid move
-            
-        # Find where the token will land
-        placement_row = -1
-        for row in range(ROWS-1, -1, -1):
-            if self.board[row][column] == EMPTY:
-                placement_row = row
-                break
-                
-        if placement_row == -1:
-            return True  # Column full
-            
-        # Place our token
-        self.board[placement_row][column] = self.current_player
-        
-        # If it's the top row, the opponent can't play above
-        if placement_row == 0:
-            self.board[placement_row][column] = EMPTY
-            return False
-            
-        # Otherwise, check if the opponent wins by playing above
-        opponent = PLAYER_X if self.current_player == PLAYER_O else PLAYER_O
-        self.board[placement_row-1][column] = opponent
-        
-        opponent_victory = self.check_victory()
-        
-        # Undo the moves
-        self.board[placement_row-1][column] = EMPTY
-        self.board[placement_row][column] = EMPTY
-        
-        return opponent_victory
+        if not self.bitboard.can_play(column):
+            return True  # Invalid move or column full
+        # The opponent would win by playing right above our token
+        return column in self.threats.unsafe_columns(self.current_player)
 
     def end_game(self, winner):
         # Always ensure we have a valid start_time
@@ -584,10 +613,14 @@ class Connect4:
                 duration = 0
         
         # Add the game to statistics
-        stats = self.stats_manager.ajouter_partie(winner, duration, self.game_moves)
+        stats = None
+        if self.stats_manager is not None:
+            stats = self.stats_manager.ajouter_partie(winner, duration, self.game_moves)
         
-        # Update learned patterns
-        self.learned_patterns = self.stats_manager.analyze_victory_history()
+        # Update learned patterns with the moves of this game only, the
+        # history has already been analyzed when the game was created
+        if winner in (PLAYER_X, PLAYER_O):
+            self.learned_patterns.add_game(winner, self.game_moves)
         
         # Reset the moves of the game
         self.game_moves = []
@@ -597,23 +630,23 @@ class Connect4:
         
         return stats
 
+    def shutdown(self):
+        """Stops the worker processes of the parallel search, if any"""
+        if self.parallel_search is not None:
+            self.parallel_search.shutdown()
+
     def display_pattern_info(self):
         """Displays information about learned patterns for debugging"""
-        if not self.learned_patterns:
+        if not self.learned_patterns or self.learned_patterns.is_empty():
             print("No learned patterns.")
             return
             
         print("----- LEARNED PATTERNS INFORMATION -----")
         for player in ['X', 'O']:
-            if player in self.learned_patterns and self.learned_patterns[player]['frequence']:
-                print(f"Player {player} - {len(self.learned_patterns[player]['coups'])} recorded moves")
+            frequent_positions = self.learned_patterns.top_positions(player, 5)
+            if frequent_positions:
+                print(f"Player {player} - {self.learned_patterns.moves[player]} recorded moves")
                 print(f"Frequent positions (top 5):")
-                # Sort by frequency and display the top 5
-                frequent_positions = sorted(
-                    self.learned_patterns[player]['frequence'].items(),
-                    key=lambda x: x[1],
-                    reverse=True
-                )[:5]
                 for pos, freq in frequent_positions:
                     print(f"  Position {pos}: used {freq} times")
             else:
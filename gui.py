@@ -1,20 +1,28 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
+import queue
 import random
+import threading
 import traceback
 from constants import *
 from game import Connect4
 from visualisation import StatsVisualization
 
 class Connect4GUI:
-    def __init__(self):
+    def __init__(self, rows=ROWS, columns=COLUMNS, connect=CONNECT):
+        # Board geometry of the games, the default is the classic 6x7
+        self.rows = rows
+        self.columns = columns
+        # Worker thread choosing the AI move in progress, if any
+        self.ai_thread = None
         # Check and fix potential issues in initialization
         self.root = tk.Tk()
         self.root.title("Connect 4")
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
         self.root.configure(bg=COLORS['background'])
         
         # Set minimum window size to ensure all elements are visible
-        self.root.minsize(COLUMNS * CELL_SIZE + 100, ROWS * CELL_SIZE + 400)  # Increased minimum height
+        self.root.minsize(self.columns * CELL_SIZE + 100, self.rows * CELL_SIZE + 400)  # Increased minimum height
         
         # Global style
         style = ttk.Style()
@@ -22,7 +30,7 @@ class Connect4GUI:
         style.configure('TLabel', **LABEL_STYLE)
         
         try:
-            self.game = Connect4()
+            self.game = Connect4(rows, columns, connect)
         except Exception as e:
             print(f"Error initializing game: {e}")
             # Create a fallback game object or initialize with None
@@ -131,8 +139,8 @@ class Connect4GUI:
         # Creation of canvas with improved style
         self.canvas = tk.Canvas(
             self.main_frame,
-            width=COLUMNS * CELL_SIZE,
-            height=ROWS * CELL_SIZE,
+            width=self.columns * CELL_SIZE,
+            height=self.rows * CELL_SIZE,
             **CANVAS_STYLE
         )
         self.canvas.pack(pady=(0, 30))  # Added bottom padding
@@ -216,7 +224,7 @@ class Connect4GUI:
         self.quit_button = tk.Button(
             self.controls_frame2,
             text="🚪 Quit",
-            command=self.root.quit,
+            command=self.close,
             height=1,  # Fixed height
             width=12,  # Fixed width
             fg=COLORS['background'],
@@ -235,8 +243,8 @@ class Connect4GUI:
         
         # Center the window and set its size
         self.root.update_idletasks()
-        width = max(self.root.winfo_reqwidth(), COLUMNS * CELL_SIZE + 100)
-        height = max(self.root.winfo_reqheight(), ROWS * CELL_SIZE + 400)
+        width = max(self.root.winfo_reqwidth(), self.columns * CELL_SIZE + 100)
+        height = max(self.root.winfo_reqheight(), self.rows * CELL_SIZE + 400)
         x = (self.root.winfo_screenwidth() // 2) - (width // 2)
         y = (self.root.winfo_screenheight() // 2) - (height // 2)
         self.root.geometry(f'{width}x{height}+{x}+{y}')
@@ -247,7 +255,7 @@ class Connect4GUI:
         # Draw board background
         self.canvas.create_rectangle(
             0, 0,
-            COLUMNS * CELL_SIZE, ROWS * CELL_SIZE,
+            self.columns * CELL_SIZE, self.rows * CELL_SIZE,
             fill=COLORS['board'],
             outline=COLORS['border'],
             width=2
@@ -256,9 +264,9 @@ class Connect4GUI:
         # Initialize array to store cell references
         self.cells = []
         
-        for row in range(ROWS):
+        for row in range(self.rows):
             row_cells = []
-            for col in range(COLUMNS):
+            for col in range(self.columns):
                 x1 = col * CELL_SIZE
                 y1 = row * CELL_SIZE
                 x2 = x1 + CELL_SIZE
@@ -276,8 +284,11 @@ class Connect4GUI:
             self.cells.append(row_cells)
 
     def handle_hover(self, event):
+        # The board belongs to the AI while it is thinking
+        if self.ai_thread is not None:
+            return
         column = event.x // CELL_SIZE
-        if 0 <= column < COLUMNS:
+        if 0 <= column < self.columns:
             # Clear the board
             self.draw_board()
             
@@ -299,8 +310,12 @@ class Connect4GUI:
         # If it's AI's turn, don't allow player to play
         if self.game.current_player == PLAYER_O and self.game.ai_mode:
             return
+        if self.ai_thread is not None:
+            return
             
         column = event.x // CELL_SIZE
+        # Stop the AI pondering before touching the board
+        self.game.stop_pondering()
         
         # Always ensure start_time is set before potentially ending the game
         import time
@@ -335,24 +350,78 @@ class Connect4GUI:
             self.draw_board()
             self.update_interface()
             
-            # AI's turn - add a 1 second delay
+            # AI's turn - short delay so that the human move is seen first
             if self.game.current_player == PLAYER_O and self.game.ai_mode:
                 # Disable events while AI is thinking
                 self.canvas.unbind('<Button-1>')
                 # Update label to show AI is thinking
                 self.player_label.config(text="AI is thinking... 🤔")
-                # Call play_ai_move after 1 second
-                self.root.after(1000, self.play_ai_move)
+                self.root.after(AI_MOVE_DELAY, self.play_ai_move)
+                
+        elif self.game.ai_mode:
+            # Full column: the human is still thinking
+            self.game.start_pondering()
+
+    def run_ai(self, on_done):
+        """
+        Chooses the AI move in a worker thread so that the window stays
+        responsive, on_done(column) is then called from the Tk event loop
+        """
+        self.cancel_ai()
+        self.game.ai_cancel.clear()
+        results = queue.Queue()
+        # The worker never touches the position shown by the interface
+        game = self.game.snapshot()
+
+        def work():
+            try:
+                results.put((game.choose_best_move(), None))
+            except Exception:
+                results.put((None, traceback.format_exc()))
+
+        self.ai_thread = threading.Thread(target=work, daemon=True)
+        self.ai_thread.start()
+        self.root.after(AI_POLL_INTERVAL, self._poll_ai, self.ai_thread, results, on_done)
+
+    def _poll_ai(self, thread, results, on_done):
+        if thread is not self.ai_thread:
+            # The move has been cancelled
+            return
+        try:
+            column, error = results.get_nowait()
+        except queue.Empty:
+            self.root.after(AI_POLL_INTERVAL, self._poll_ai, thread, results, on_done)
+            return
+        self.ai_thread = None
+        if error:
+            print(f"Error choosing AI move: {error}")
+        on_done(column)
+
+    def cancel_ai(self):
+        """Stops the AI move in progress, its result is dropped"""
+        if self.ai_thread is not None:
+            self.game.ai_cancel.set()
+            # Never block the event loop for long: the searches all stop within
+            # a poll interval, a late thread is left to finish on its own
+            self.ai_thread.join(AI_CANCEL_TIMEOUT)
+            if self.ai_thread.is_alive():
+                print("The cancelled AI move is still running, its result will be dropped")
+            self.ai_thread = None
 
     def play_ai_move(self):
         """Make the AI play"""
+        # The game may have been reset or the mode changed in the meantime
+        if not self.game.ai_mode or self.game.current_player != PLAYER_O:
+            return
+        # Always ensure start_time is set before AI plays
+        import time
+        if not hasattr(self.game, 'start_time') or self.game.start_time is None:
+            self.game.start_time = time.time()
+        self.run_ai(self.execute_ai_move)
+
+    def execute_ai_move(self, column):
+        """Plays the move chosen by the AI"""
         try:
-            # Always ensure start_time is set before AI plays
-            import time
-            if not hasattr(self.game, 'start_time') or self.game.start_time is None:
-                self.game.start_time = time.time()
-                
-            column = self.game.choose_best_move()
             if column is not None:
                 result = self.game.place_token(column)
                 
@@ -381,6 +450,8 @@ class Connect4GUI:
                     self.game.change_player()
                     self.draw_board()
                     self.update_interface()
+                    # Think about the replies while the human is deciding
+                    self.game.start_pondering()
         finally:
             # Re-enable events after AI move
             self.canvas.bind('<Button-1>', self.handle_click)
@@ -396,10 +467,14 @@ class Connect4GUI:
         # Update label to show which AI is thinking
         current_player_name = "AI 1 (X)" if self.game.current_player == PLAYER_X else "AI 2 (O)"
         self.player_label.config(text=f"{current_player_name} is thinking... 🤔")
-        self.root.update()
         
-        # Choose and play move
-        column = self.game.choose_best_move()
+        # Choose the move in the background
+        self.run_ai(self.schedule_ai_vs_ai_move)
+
+    def schedule_ai_vs_ai_move(self, column):
+        """Plays the move chosen in AI vs AI mode after a delay"""
+        if not self.game.ai_vs_ai_mode:
+            return
         if column is not None:
             # Add delay to visualize moves
             self.root.after(500, lambda col=column: self.execute_ai_vs_ai_move(col))
@@ -535,6 +610,11 @@ class Connect4GUI:
         else:
             # AI mode is being disabled
             self.game.ai_mode = False
+            self.game.stop_pondering()
+            # An AI move in progress is dropped, the human plays both sides
+            self.cancel_ai()
+            self.canvas.bind('<Button-1>', self.handle_click)
+            self.player_label.config(text=f"Player {self.game.current_player}'s turn")
             self.ai_mode_button.config(
                 text="AI Mode: Off",
                 bg=COLORS['button']
@@ -546,7 +626,7 @@ class Connect4GUI:
         level_window = tk.Toplevel(self.root)
         level_window.title("Select AI Level")
         level_window.configure(bg=COLORS['background'])
-        level_window.geometry("300x200")
+        level_window.geometry("360x320")
         level_window.transient(self.root)  # Set as transient to main window
         level_window.grab_set()  # Modal window
         level_window.resizable(False, False)
@@ -591,7 +671,7 @@ class Connect4GUI:
             activebackground='#2980B9',
             activeforeground=COLORS['background']
         )
-        moderate_button.pack(side=tk.LEFT, padx=10)
+        moderate_button.grid(row=0, column=0, padx=10, pady=5)
         
         # Advanced AI button
         def select_advanced():
@@ -614,7 +694,73 @@ class Connect4GUI:
             activebackground='#8E44AD',
             activeforeground=COLORS['background']
         )
-        advanced_button.pack(side=tk.LEFT, padx=10)
+        advanced_button.grid(row=0, column=1, padx=10, pady=5)
+        
+        # Expert AI button
+        def select_expert():
+            self.game.ai_level = 3
+            self.ai_mode_button.config(
+                text="AI: Expert",
+                bg='#C0392B'
+            )
+            level_window.destroy()
+        
+        expert_button = tk.Button(
+            buttons_frame,
+            text="Expert AI\nSearches ahead",
+            command=select_expert,
+            height=2,
+            width=15,
+            fg=COLORS['background'],
+            bg='#E74C3C',
+            activebackground='#C0392B',
+            activeforeground=COLORS['background']
+        )
+        expert_button.grid(row=1, column=0, padx=10, pady=5)
+        
+        # Perfect AI button
+        def select_perfect():
+            self.game.ai_level = 4
+            self.ai_mode_button.config(
+                text="AI: Perfect",
+                bg='#1E8449'
+            )
+            level_window.destroy()
+        
+        perfect_button = tk.Button(
+            buttons_frame,
+            text="Perfect AI\nExact from move ~16",
+            command=select_perfect,
+            height=2,
+            width=15,
+            fg=COLORS['background'],
+            bg='#27AE60',
+            activebackground='#1E8449',
+            activeforeground=COLORS['background']
+        )
+        perfect_button.grid(row=1, column=1, padx=10, pady=5)
+        
+        # MCTS AI button
+        def select_mcts():
+            self.game.ai_level = 5
+            self.ai_mode_button.config(
+                text="AI: MCTS",
+                bg='#D68910'
+            )
+            level_window.destroy()
+        
+        mcts_button = tk.Button(
+            buttons_frame,
+            text="MCTS AI\nSimulates games",
+            command=select_mcts,
+            height=2,
+            width=15,
+            fg=COLORS['background'],
+            bg='#F39C12',
+            activebackground='#D68910',
+            activeforeground=COLORS['background']
+        )
+        mcts_button.grid(row=2, column=0, padx=10, pady=5)
         
         # Cancel button
         def cancel_selection():
@@ -635,6 +781,9 @@ class Connect4GUI:
 
     def toggle_ai_vs_ai_mode(self):
         """Enable or disable AI vs AI mode"""
+        # Stop the AI move in progress, in either mode
+        self.cancel_ai()
+        self.game.stop_pondering()
         # Disable player vs AI mode if activating AI vs AI mode
         if not self.game.ai_vs_ai_mode:
             self.game.ai_mode = False
@@ -654,15 +803,18 @@ class Connect4GUI:
         # If activating this mode, automatically start a game
         if self.game.ai_vs_ai_mode:
             self.reset_game()
-            # Let the interface refresh before starting
-            self.root.update()
             self.root.after(500, self.play_ai_vs_ai_move)
+        else:
+            self.player_label.config(text=f"Player {self.game.current_player}'s turn")
 
     def update_score(self):
         self.score_x_label.config(text=f"Player {PLAYER_X}: {self.game.scores[PLAYER_X]}")
         self.score_o_label.config(text=f"Player {PLAYER_O}: {self.game.scores[PLAYER_O]}")
 
     def reset_game(self):
+        # Drop the AI move in progress before the board changes
+        self.cancel_ai()
+        self.canvas.bind('<Button-1>', self.handle_click)
         # Always make sure start_time is set to the current time before resetting
         import time
         self.game.start_time = time.time()
@@ -685,6 +837,9 @@ class Connect4GUI:
             icon='warning'
         ):
             self.game.stats_manager.reinitialiser_stats()
+            # The learned patterns come from the history that has just been erased
+            self.game.learned_patterns = self.game.stats_manager.analyser_historique_victoires(
+                self.game.rows, self.game.columns)
             messagebox.showinfo("Success", "Statistics have been reset.")
             # Refresh display if stats window is open
             if hasattr(self, 'stats_window') and self.stats_window.winfo_exists():
@@ -782,12 +937,7 @@ class Connect4GUI:
         ).pack(pady=(0, 20))
         
         # Check if patterns are available
-        if not self.game.learned_patterns or not (
-            'X' in self.game.learned_patterns and 
-            'O' in self.game.learned_patterns and
-            (self.game.learned_patterns['X']['frequence'] or 
-             self.game.learned_patterns['O']['frequence'])
-        ):
+        if not self.game.learned_patterns or self.game.learned_patterns.is_empty():
             tk.Label(
                 main_frame,
                 text="No learning patterns available.\nPlay some games for the AI to learn.",
@@ -808,7 +958,7 @@ class Connect4GUI:
         player_frame.pack(fill=tk.X, pady=10)
         
         # Total number of recorded moves for player
-        player_moves_count = len(self.game.learned_patterns['X']['coups']) if 'X' in self.game.learned_patterns else 0
+        player_moves_count = self.game.learned_patterns.moves['X']
         tk.Label(
             player_frame,
             text=f"Number of recorded moves: {player_moves_count}",
@@ -818,13 +968,8 @@ class Connect4GUI:
         ).pack(anchor='w', padx=10, pady=5)
         
         # Frequent positions for player (top 5)
-        if 'X' in self.game.learned_patterns and self.game.learned_patterns['X']['frequence']:
-            player_positions = sorted(
-                self.game.learned_patterns['X']['frequence'].items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:5]
-            
+        player_positions = self.game.learned_patterns.top_positions('X', 5)
+        if player_positions:
             tk.Label(
                 player_frame,
                 text="Frequent positions:",
@@ -853,7 +998,7 @@ class Connect4GUI:
         ai_frame.pack(fill=tk.X, pady=10)
         
         # Total number of recorded moves for AI
-        ai_moves_count = len(self.game.learned_patterns['O']['coups']) if 'O' in self.game.learned_patterns else 0
+        ai_moves_count = self.game.learned_patterns.moves['O']
         tk.Label(
             ai_frame,
             text=f"Number of recorded moves: {ai_moves_count}",
@@ -863,13 +1008,8 @@ class Connect4GUI:
         ).pack(anchor='w', padx=10, pady=5)
         
         # Frequent positions for AI (top 5)
-        if 'O' in self.game.learned_patterns and self.game.learned_patterns['O']['frequence']:
-            ai_positions = sorted(
-                self.game.learned_patterns['O']['frequence'].items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:5]
-            
+        ai_positions = self.game.learned_patterns.top_positions('O', 5)
+        if ai_positions:
             tk.Label(
                 ai_frame,
                 text="Frequent positions:",
@@ -918,8 +1058,8 @@ class Connect4GUI:
 
     def update_interface(self):
         """Update the game board display"""
-        for row in range(ROWS):
-            for column in range(COLUMNS):
+        for row in range(self.rows):
+            for column in range(self.columns):
                 color = COLORS[EMPTY]
                 if self.game.board[row][column] == PLAYER_X:
                     color = COLORS[PLAYER_X]
@@ -932,5 +1072,14 @@ class Connect4GUI:
                 )
         self.canvas.update()
 
+    def close(self):
+        """Stops the AI threads, flushes the stats file and closes the window"""
+        self.cancel_ai()
+        if self.game is not None:
+            self.game.stop_pondering()
+            self.game.stats_manager.fermer()
+        self.root.destroy()
+
     def start(self):
-        self.root.mainloop()
\ No newline at end of file
+        self.root.mainloop()
+        self.game.shutdown()
\ No newline at end of file
@@ -0,0 +1,81 @@
+import json
+import time
+
+# Strategies that can decide an AI move, see Connect4.decision_branch
+BRANCHES = ('book', 'opening', 'immediate_win', 'block', 'repetition', 'pattern',
+            'evaluation', 'random', 'search', 'ponder', 'solver', 'mcts')
+
+
+class Instrumentation:
+    """
+    Records what every AI decision of a game cost.
+
+    Connect4 keeps a few always-on counters (victory checks, positions
+    evaluated, cache hits) and notes the strategy that decided each move.
+    When instrumentation is enabled, choose_best_move goes through record(),
+    which stores the difference of these counters around the decision with
+    its wall time. When it is disabled, the only cost left is the counter
+    increments.
+    """
+
+    def __init__(self):
+        self.decisions = []  # Decisions of the current game
+        self.games = []  # Decisions of the previous games
+
+    def record(self, game, choose):
+        """Calls choose() for `game` and records the decision"""
+        victory_checks = game.victory_checks
+        positions = game.positions_evaluated
+        cache_hits = game.cache_hits
+        start = time.perf_counter()
+        column = choose()
+        elapsed = time.perf_counter() - start
+        self.decisions.append({
+            'move': len(game.game_moves) + 1,
+            'player': game.current_player,
+            'level': game.ai_level,
+            'column': column,
+            'branch': game.decision_branch,
+            'seconds': elapsed,
+            'positions': game.positions_evaluated - positions,
+            'victory_checks': game.victory_checks - victory_checks,
+            'depth': game.decision_depth,
+            'cache_hits': game.cache_hits - cache_hits
+        })
+        return column
+
+    def new_game(self):
+        """Closes the decisions of the current game"""
+        if self.decisions:
+            self.games.append(self.decisions)
+        self.decisions = []
+
+    def get_decisions(self, game=None):
+        """Decisions of the current game, or of a previous game by index"""
+        return list(self.decisions if game is None else self.games[game])
+
+    def summary(self, decisions=None):
+        """Totals of a list of decisions (the current game by default)"""
+        decisions = self.decisions if decisions is None else decisions
+        branches = {}
+        for decision in decisions:
+            branches[decision['branch']] = branches.get(decision['branch'], 0) + 1
+        count = len(decisions)
+        seconds = sum(decision['seconds'] for decision in decisions)
+        return {
+            'decisions': count,
+            'seconds': round(seconds, 4),
+            'average_ms': round(seconds / count * 1000, 3) if count > 0 else 0,
+            'max_ms': round(max((d['seconds'] for d in decisions), default=0) * 1000, 3),
+            'positions': sum(decision['positions'] for decision in decisions),
+            'victory_checks': sum(decision['victory_checks'] for decision in decisions),
+            'max_depth': max((decision['depth'] for decision in decisions), default=0),
+            'cache_hits': sum(decision['cache_hits'] for decision in decisions),
+            'branches': branches
+        }
+
+    def dump(self, path, game=None):
+        """Writes the decisions of a game and their summary as JSON"""
+        decisions = self.get_decisions(game)
+        with open(path, 'w') as f:
+            json.dump({'summary': self.summary(decisions), 'decisions': decisions}, f, indent=2)
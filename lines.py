@@ -0,0 +1,65 @@
+from constants import *
+
+# Line tables already built, by (rows, columns, length)
+_LINE_TABLES = {}
+
+# Directions of the lines as (row step, column step), row 0 being the top
+HORIZONTAL = (0, 1)
+VERTICAL = (1, 0)
+DIAGONAL_DOWN = (1, 1)  # Diagonal \
+DIAGONAL_UP = (-1, 1)  # Diagonal /
+DIRECTIONS = (HORIZONTAL, VERTICAL, DIAGONAL_DOWN, DIAGONAL_UP)
+
+
+class LineTable:
+    """
+    Every line of `length` aligned cells of a board geometry.
+
+    With length `connect` these are the winning lines. Each line is a tuple
+    of (row, column) grid cells, row 0 being the top of the grid, and has
+    the matching bitboard mask. cell_lines[row][col] lists the indices of the
+    lines going through a cell, and bit_lines[index] the masks of the lines
+    going through a bitboard bit, so that the lines touched by a move are
+    found without scanning the board.
+    """
+
+    def __init__(self, rows=ROWS, columns=COLUMNS, length=CONNECT):
+        self.rows = rows
+        self.columns = columns
+        self.length = length
+        stride = rows + 1
+        self.lines = []
+        self.masks = []
+        self.directions = []  # Direction of each line
+        self.cell_lines = [[[] for _ in range(columns)] for _ in range(rows)]
+        self.bit_lines = [[] for _ in range(stride * columns)]
+        for d_row, d_col in DIRECTIONS:
+            for row in range(rows):
+                for col in range(columns):
+                    end_row = row + (length - 1) * d_row
+                    end_col = col + (length - 1) * d_col
+                    if not (0 <= end_row < rows and end_col < columns):
+                        continue
+                    line = tuple((row + i * d_row, col + i * d_col) for i in range(length))
+                    mask = 0
+                    for r, c in line:
+                        mask |= 1 << (c * stride + rows - 1 - r)
+                        self.cell_lines[r][c].append(len(self.lines))
+                    for r, c in line:
+                        self.bit_lines[c * stride + rows - 1 - r].append(mask)
+                    self.lines.append(line)
+                    self.masks.append(mask)
+                    self.directions.append((d_row, d_col))
+
+    def lines_in_direction(self, direction):
+        """Returns the lines going in one of the DIRECTIONS"""
+        return [line for line, d in zip(self.lines, self.directions) if d == direction]
+
+
+def line_table(rows=ROWS, columns=COLUMNS, length=CONNECT):
+    """Returns the LineTable of a board geometry, built on first use"""
+    table = _LINE_TABLES.get((rows, columns, length))
+    if table is None:
+        table = LineTable(rows, columns, length)
+        _LINE_TABLES[(rows, columns, length)] = table
+    return table
@@ -1,5 +1,16 @@
-from gui import Connect4GUI
+import argparse
 
 if __name__ == "__main__":
-    jeu = Connect4GUI()
-    jeu.start()  # Changed from mainloop() to start()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Connect 4")
+    parser.add_argument('--profile-imports', action='store_true',
+                        help="list the slowest imports of the game instead of starting it")
+    args = parser.parse_args()
+
+    if args.profile_imports:
+        from benchmark import profile_imports
+        profile_imports()
+    else:
+        # Imported here so that the profile measures the imports of the game on their own
+        from gui import Connect4GUI
+        jeu = Connect4GUI()
+        jeu.start()  # Changed from mainloop() to start()
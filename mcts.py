@@ -0,0 +1,233 @@
+import math
+import time
+import numpy as np
+from constants import *
+
+
+class MCTSNode:
+    """Node of the search tree, reached by playing `move`"""
+
+    def __init__(self, parent=None, move=None, moves=()):
+        self.parent = parent
+        self.move = move
+        self.children = {}  # column -> MCTSNode
+        self.untried = list(moves)  # Playable columns not expanded yet
+        self.visits = 0
+        # Sum of the rewards, from the point of view of the player who played `move`
+        self.reward = 0.0
+        self.terminal_value = None  # Reward of a finished game, if this node ends it
+
+    def best_child(self, exploration):
+        """Returns the child with the best UCT value"""
+        log_visits = math.log(self.visits)
+        return max(
+            self.children.values(),
+            key=lambda child: child.reward / child.visits
+            + exploration * math.sqrt(log_visits / child.visits)
+        )
+
+
+class MCTS:
+    """
+    Monte Carlo Tree Search with batched random playouts.
+
+    Every iteration selects a leaf with UCT, expands it, then plays
+    `batch_size` random games from it at once: the games are stored as
+    NumPy arrays of 64-bit bitboards, and each ply of all the games is
+    played with a handful of vectorized operations instead of a Python loop
+    per game. The tree is kept between the moves of a game, so the search
+    continues from the subtree of the position actually reached.
+    """
+
+    def __init__(self, time_limit=AI_TIME_LIMIT, iterations=None, batch_size=MCTS_BATCH_SIZE,
+                 exploration=MCTS_EXPLORATION, seed=None):
+        self.time_limit = time_limit
+        self.iterations = iterations
+        self.batch_size = batch_size
+        self.exploration = exploration
+        self.rng = np.random.default_rng(seed)
+        self.geometry = None
+        self.root = None
+        self.root_history = None  # Columns played to reach the root
+        self.last_stats = {}
+        # Optional threading.Event: once set, the search stops like on timeout
+        self.cancel = None
+
+    def _prepare(self, board):
+        """Precomputes the masks used by the playouts for the board geometry"""
+        if self.geometry == (board.rows, board.columns, board.connect):
+            return
+        if board.stride * board.columns > 64:
+            raise ValueError("MCTS playouts need a board that fits in 64 bits")
+        self.geometry = (board.rows, board.columns, board.connect)
+        self.connect = board.connect
+        self.root = None
+        column_mask = (1 << board.rows) - 1
+        self.column_masks = np.array([column_mask << (col * board.stride) for col in range(board.columns)],
+                                     dtype=np.uint64)
+        self.bottom_cells = np.array([1 << (col * board.stride) for col in range(board.columns)],
+                                     dtype=np.uint64)
+        self.top_cells = np.array([1 << (col * board.stride + board.rows - 1) for col in range(board.columns)],
+                                  dtype=np.uint64)
+        self.shifts = [np.uint64(shift) for shift in (1, board.stride, board.stride + 1, board.stride - 1)]
+
+    def search(self, bitboard, player):
+        """Returns the most visited column after the time or iteration budget"""
+        self._prepare(bitboard)
+        self.last_stats = {}
+        board = bitboard.copy()
+        opponent = PLAYER_X if player == PLAYER_O else PLAYER_O
+        moves = [col for col in range(board.columns) if board.can_play(col)]
+        if not moves:
+            return None
+
+        # Immediate wins and forced blocks don't need a search
+        playable = board.playable_cells()
+        for cells in (board.winning_cells(player), board.winning_cells(opponent)):
+            for col in moves:
+                if board.move_bit(col) & cells & playable:
+                    return col
+
+        reused = self._reuse_tree(board)
+        if not reused:
+            self.root = MCTSNode(moves=moves)
+            self.root_history = [col for _, col in board.moves]
+
+        start = time.perf_counter()
+        deadline = start + self.time_limit if self.time_limit else None
+        iterations = 0
+        playouts = 0
+        while True:
+            if self.iterations is not None and iterations >= self.iterations:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if self.cancel is not None and self.cancel.is_set() and iterations > 0:
+                break
+            playouts += self._iterate(board, player, opponent)
+            iterations += 1
+            if self.iterations is None and deadline is None and iterations >= 1000:
+                break
+
+        elapsed = time.perf_counter() - start
+        best = max(self.root.children.values(), key=lambda child: child.visits)
+        self.last_stats = {
+            'iterations': iterations,
+            'playouts': playouts,
+            'seconds': round(elapsed, 3),
+            'playouts_per_second': round(playouts / elapsed) if elapsed > 0 else 0,
+            'root_visits': self.root.visits,
+            'tree_reused': reused,
+            'win_rate': round(best.reward / best.visits * 100, 1)
+        }
+        return best.move
+
+    def _reuse_tree(self, board):
+        """Moves the root down to the current position if it is in the tree"""
+        if self.root is None:
+            return False
+        history = [col for _, col in board.moves]
+        if history[:len(self.root_history)] != self.root_history:
+            return False
+        node = self.root
+        for col in history[len(self.root_history):]:
+            node = node.children.get(col)
+            if node is None:
+                return False
+        node.parent = None
+        self.root = node
+        self.root_history = history
+        return node.visits > 0
+
+    def _iterate(self, board, player, opponent):
+        """Runs one selection, expansion, simulation and backpropagation"""
+        node = self.root
+        depth = 0
+        mover = opponent  # Player who played the move leading to `node`
+        # Selection
+        while not node.untried and node.children and node.terminal_value is None:
+            node = node.best_child(self.exploration)
+            mover = PLAYER_X if mover == PLAYER_O else PLAYER_O
+            board.play(node.move, mover)
+            depth += 1
+
+        playouts = 0
+        if node.terminal_value is not None:
+            reward = node.terminal_value
+        else:
+            # Expansion
+            if node.untried:
+                col = node.untried.pop(self.rng.integers(len(node.untried)))
+                mover = PLAYER_X if mover == PLAYER_O else PLAYER_O
+                board.play(col, mover)
+                depth += 1
+                child = MCTSNode(node, col, [c for c in range(board.columns) if board.can_play(c)])
+                node.children[col] = child
+                node = child
+                if board.last_move_wins():
+                    node.terminal_value = 1.0
+                elif board.is_full():
+                    node.terminal_value = 0.5
+            if node.terminal_value is not None:
+                reward = node.terminal_value
+            else:
+                # Simulation: the reward of the player to move, seen from the mover
+                to_move = PLAYER_X if mover == PLAYER_O else PLAYER_O
+                outcome = self._playouts(board, board.bits[to_move], board.mask)
+                reward = (1.0 - outcome) / 2
+                playouts = self.batch_size
+
+        for _ in range(depth):
+            board.undo()
+
+        # Backpropagation, the reward flips at every level
+        while node is not None:
+            node.visits += 1
+            node.reward += reward
+            reward = 1.0 - reward
+            node = node.parent
+        return playouts
+
+    def _playouts(self, board, position, mask):
+        """
+        Plays batch_size random games from the position and returns the mean
+        outcome for the player to move: 1 win, -1 loss, 0 draw.
+        """
+        count = self.batch_size
+        current = np.full(count, position, dtype=np.uint64)
+        occupied = np.full(count, mask, dtype=np.uint64)
+        outcome = np.zeros(count, dtype=np.int8)
+        active = np.arange(count)
+        sign = 1
+        for _ in range(board.rows * board.columns - board.move_count):
+            if active.size == 0:
+                break
+            cur = current[active]
+            occ = occupied[active]
+            # Random legal column for every game still running
+            legal = (occ[:, None] & self.top_cells[None, :]) == 0
+            choice = np.where(legal, self.rng.random(legal.shape), -1.0).argmax(axis=1)
+            bit = (occ + self.bottom_cells[choice]) & self.column_masks[choice]
+            cur |= bit
+            occ |= bit
+            won = self._aligned(cur)
+            outcome[active[won]] = sign
+            # The opponent is to move in the games still running
+            current[active] = cur ^ occ
+            occupied[active] = occ
+            active = active[~won]
+            sign = -sign
+        return float(outcome.mean())
+
+    def _aligned(self, bits):
+        """Vectorized has_alignment: which bitboards contain `connect` aligned tokens"""
+        found = np.zeros(bits.shape, dtype=bool)
+        for shift in self.shifts:
+            run = bits
+            length = 1
+            while length < self.connect:
+                step = min(length, self.connect - length)
+                run = run & (run >> (shift * np.uint64(step)))
+                length += step
+            found |= run != 0
+        return found
@@ -0,0 +1,154 @@
+from constants import *
+
+# Priority of each kind of move, from the first searched to the last
+_TABLE_MOVE = 1 << 40  # Best move stored in the transposition table
+_WINNING_MOVE = 1 << 36
+_BLOCKING_MOVE = 1 << 32
+_KILLER_MOVE = 1 << 28
+_THREAT = 1 << 20  # Per winning cell created by the move
+_LOSING_MOVE = -(1 << 36)  # Lets the opponent win right above
+_HISTORY_CAP = (1 << 20) - 1
+
+
+def _score_key(entry):
+    return entry[0]
+
+
+class MoveOrderer:
+    """
+    Orders the moves of a search so that cutoffs happen as early as possible.
+
+    Moves are sorted by, in that order:
+    - the best move found by a previous search of the position
+    - winning moves, then moves blocking an immediate win of the opponent
+    - threat-first: moves creating the most winning cells
+    - killer moves: the last moves that caused a cutoff at the same ply
+    - the history heuristic: how often the move caused cutoffs so far
+    - the distance to the center column
+    Moves letting the opponent win right above them are searched last.
+
+    The cutoff statistics tell how good the ordering is: in a well-ordered
+    search, nearly every cutoff is caused by the first move searched.
+    """
+
+    def __init__(self, columns=COLUMNS, killers_per_ply=2, threat_depth=5):
+        self.columns = columns
+        self.killers_per_ply = killers_per_ply
+        # Counting the threats of every move is costly, so near the leaves
+        # of the search only the cheaper heuristics are used
+        self.threat_depth = threat_depth
+        center = columns // 2
+        # Static center-first order, used to break ties
+        self.center_bonus = [columns - abs(col - center) for col in range(columns)]
+        self.center_order = sorted(range(columns), key=lambda col: abs(col - center))
+        self.killers = {}  # ply -> list of columns
+        self.history = {PLAYER_X: {}, PLAYER_O: {}}  # player -> {cell bit index: score}
+        self.reset_stats()
+
+    def for_board(self, board):
+        """
+        Returns this orderer if it was built for the columns of the board,
+        otherwise a new one with the same settings for that width
+        """
+        if board.columns == self.columns:
+            return self
+        return MoveOrderer(board.columns, self.killers_per_ply, self.threat_depth)
+
+    def reset_stats(self):
+        """Resets the cutoff statistics"""
+        self.nodes = 0
+        self.cutoffs = 0
+        self.cutoff_positions = [0] * self.columns  # Index of the move that caused each cutoff
+        self.killer_cutoffs = 0
+
+    def new_search(self):
+        """Forgets the killer moves and ages the history of the previous search"""
+        self.killers = {}
+        for table in self.history.values():
+            for index in list(table):
+                table[index] //= 2
+                if not table[index]:
+                    del table[index]
+
+    def order(self, board, player, ply, table_move=None, depth=None):
+        """
+        Returns the playable columns of the position, best candidates first.
+        `depth` is the remaining search depth, threats are only counted when
+        it is at least threat_depth (or unknown).
+        """
+        killers = self.killers.get(ply, ())
+        history = self.history[player]
+        self.nodes += 1
+
+        scored = []
+        if depth is not None and depth < self.threat_depth:
+            # Cheap ordering near the leaves: no threat detection
+            heights = board.heights
+            stride = board.stride
+            for col in self.center_order:
+                height = heights[col]
+                if height >= board.rows:
+                    continue
+                if col == table_move:
+                    score = _TABLE_MOVE
+                else:
+                    score = history.get(col * stride + height, 0)
+                    if col in killers:
+                        score += _KILLER_MOVE
+                scored.append((score, col))
+            scored.sort(key=_score_key, reverse=True)
+            return [col for _, col in scored]
+
+        opponent = PLAYER_X if player == PLAYER_O else PLAYER_O
+        own_wins = board.winning_cells(player)
+        opponent_wins = board.winning_cells(opponent)
+        own_bits = board.bits[player]
+        mask = board.mask
+        for col in range(self.columns):
+            if not board.can_play(col):
+                continue
+            bit = board.move_bit(col)
+            if col == table_move:
+                score = _TABLE_MOVE
+            elif bit & own_wins:
+                score = _WINNING_MOVE
+            elif bit & opponent_wins:
+                score = _BLOCKING_MOVE
+            elif (bit << 1) & opponent_wins:
+                score = _LOSING_MOVE
+            else:
+                threats = bin(board.completing_cells(own_bits | bit, mask | bit)).count('1')
+                score = threats * _THREAT
+                if col in killers:
+                    score += _KILLER_MOVE
+                score += min(history.get(bit.bit_length() - 1, 0), _HISTORY_CAP)
+            scored.append((score * 16 + self.center_bonus[col], col))
+        scored.sort(reverse=True)
+        return [col for _, col in scored]
+
+    def record_cutoff(self, board, player, column, ply, depth, move_index):
+        """Called when `column`, the move_index-th move searched, caused a cutoff"""
+        self.cutoffs += 1
+        self.cutoff_positions[move_index] += 1
+        killers = self.killers.setdefault(ply, [])
+        if column in killers:
+            self.killer_cutoffs += 1
+        else:
+            killers.insert(0, column)
+            del killers[self.killers_per_ply:]
+        # Deep cutoffs save more work, so they weigh more
+        index = column * board.stride + board.heights[column]
+        history = self.history[player]
+        history[index] = history.get(index, 0) + depth * depth
+
+    def get_stats(self):
+        """Returns the cutoff statistics of the ordering"""
+        return {
+            'nodes': self.nodes,
+            'cutoffs': self.cutoffs,
+            'cutoff_rate': round(self.cutoffs / self.nodes * 100, 1) if self.nodes > 0 else 0,
+            'first_move_cutoffs': self.cutoff_positions[0],
+            'first_move_cutoff_rate': round(self.cutoff_positions[0] / self.cutoffs * 100, 1) if self.cutoffs > 0 else 0,
+            'cutoff_positions': list(self.cutoff_positions),
+            'killer_cutoffs': self.killer_cutoffs
+        }
@@ -0,0 +1,142 @@
+"""
+Opening book: best replies to the first moves of a game, precomputed offline.
+
+The book file is an open-addressing hash table written as fixed-size
+records, so that it can be memory-mapped and queried without being parsed:
+
+    header  : magic "C4BK", version, rows, columns, depth (4 bytes), slot count
+    records : Zobrist hash of the position (8 bytes) + best column (1 byte)
+
+A record whose column is EMPTY_SLOT is a free slot. The moves are the
+choices of a node-limited search, not solved positions: the perfect level
+only falls back to them when the solver runs out of time. Build a book with:
+
+    python opening_book.py --depth 4 --nodes 20000
+"""
+import argparse
+import mmap
+import os
+import struct
+import time
+from constants import *
+from bitboard import BitBoard
+from search import NegamaxSearch
+from transposition import TranspositionTable
+
+MAGIC = b'C4BK'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBBI')
+RECORD = struct.Struct('<QB')
+EMPTY_SLOT = 0xFF
+
+
+def book_path(filename=OPENING_BOOK_FILE):
+    """Resolves a book file name relative to the game directory"""
+    if os.path.isabs(filename):
+        return filename
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+
+
+class OpeningBook:
+    """Read-only view of a memory-mapped book file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.rows, self.columns, self.depth, self.slots = HEADER.unpack_from(self.mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.mmap.close()
+            raise ValueError(f"{path} is not an opening book file")
+
+    @classmethod
+    def load(cls, filename=OPENING_BOOK_FILE):
+        """Maps the book file, returns None if there is no usable book"""
+        path = book_path(filename)
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError) as e:
+            print(f"Error loading opening book: {e}")
+            return None
+
+    def lookup(self, bitboard):
+        """Returns the book move for the position, or None if it isn't in the book"""
+        # Books are built for the standard rule: 4 tokens to align
+        if (bitboard.rows, bitboard.columns, bitboard.connect) != (self.rows, self.columns, 4):
+            return None
+        if bitboard.move_count >= self.depth or self.slots == 0:
+            return None
+        key = bitboard.hash
+        index = key % self.slots
+        for _ in range(self.slots):
+            stored_key, column = RECORD.unpack_from(self.mmap, HEADER.size + index * RECORD.size)
+            if column == EMPTY_SLOT:
+                return None
+            if stored_key == key:
+                return column if bitboard.can_play(column) else None
+            index = (index + 1) % self.slots
+        return None
+
+    def close(self):
+        self.mmap.close()
+
+
+def build_book(depth, time_limit=None, node_limit=20000, rows=ROWS, columns=COLUMNS):
+    """
+    Searches the best reply of every position reachable in fewer than
+    `depth` plies. Returns a dictionary {Zobrist hash: column}.
+    """
+    entries = {}
+    table = TranspositionTable()
+    search = NegamaxSearch(time_limit=time_limit, node_limit=node_limit, table=table)
+    board = BitBoard(rows, columns, 4)
+
+    def visit(player):
+        if board.move_count >= depth or board.hash in entries:
+            return
+        entries[board.hash] = search.search(board, player)
+        opponent = PLAYER_X if player == PLAYER_O else PLAYER_O
+        for column in range(columns):
+            if board.can_play(column):
+                board.play(column, player)
+                if not board.last_move_wins():
+                    visit(opponent)
+                board.undo()
+
+    visit(PLAYER_X)
+    return entries
+
+
+def write_book(path, entries, depth, rows=ROWS, columns=COLUMNS):
+    """Writes the entries as a hash table filled at most to one half"""
+    slots = max(1, 2 * len(entries))
+    records = [None] * slots
+    for key, column in entries.items():
+        index = key % slots
+        while records[index] is not None:
+            index = (index + 1) % slots
+        records[index] = (key, column)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, rows, columns, depth, slots))
+        for record in records:
+            f.write(RECORD.pack(*record) if record else RECORD.pack(0, EMPTY_SLOT))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the Connect 4 opening book")
+    parser.add_argument('--depth', type=int, default=4, help="number of plies covered by the book")
+    parser.add_argument('--nodes', type=int, default=20000, help="search budget per position, in nodes")
+    parser.add_argument('--time', type=float, default=None, help="search budget per position, in seconds")
+    parser.add_argument('--output', default=book_path(), help="book file to write")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    entries = build_book(args.depth, time_limit=args.time, node_limit=args.nodes)
+    write_book(args.output, entries, args.depth)
+    print(f"{len(entries)} positions written to {args.output} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from constants import *
+from bitboard import BitBoard
+from search import NegamaxSearch, WIN_SCORE
+from transposition import TranspositionTable
+
+# Search of each worker process, created once by the pool initializer so that
+# its transposition table stays warm from one move to the next
+_worker_search = None
+
+
+def _init_worker(table_size_mb):
+    global _worker_search
+    _worker_search = NegamaxSearch(table=TranspositionTable(table_size_mb, TT_REPLACEMENT))
+
+
+def _search_move(rows, columns, connect, history, player, column, time_limit, max_depth):
+    """
+    Worker task: `player` plays `column` after the moves of `history`, then
+    the search of the resulting position deepens until the time limit.
+    Returns the column and its score at every completed depth, for the
+    player who played it (a proven result is a single score valid at every
+    depth), plus the nodes searched and the transposition table hits.
+    """
+    board = BitBoard(rows, columns, connect)
+    for previous_player, col in history:
+        board.play(col, previous_player)
+    opponent = PLAYER_X if player == PLAYER_O else PLAYER_O
+    board.play(column, player)
+    if board.last_move_wins():
+        return column, [WIN_SCORE - board.move_count], True, 0, 0
+    if board.is_full():
+        return column, [0], True, 0, 0
+
+    _worker_search.time_limit = time_limit
+    _worker_search.max_depth = max_depth
+    _worker_search.search(board, opponent)
+    scores = [-score for score in _worker_search.depth_scores]
+    proven = bool(scores) and abs(scores[-1]) >= WIN_SCORE - rows * columns
+    return column, scores, proven, _worker_search.nodes, _worker_search.table_hits
+
+
+class RootParallelSearch:
+    """
+    Negamax search split across a pool of worker processes.
+
+    Each root move is searched by one worker, which deepens its subtree on
+    its own until the time budget is spent. The results are then compared at
+    the deepest depth completed by every move, and ties are broken by the
+    center-first column order, so the same worker results always give the
+    same move. The pool is created on first use and kept for the next moves.
+    """
+
+    def __init__(self, workers=SEARCH_WORKERS, time_limit=AI_TIME_LIMIT, max_depth=None,
+                 table_size_mb=TT_SIZE_MB):
+        self.workers = workers
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.table_size_mb = table_size_mb
+        self.executor = None
+        # Optional threading.Event: once set, the search stops waiting for the
+        # workers and returns the best move among the subtrees already searched
+        self.cancel = None
+        # Information about the last search
+        self.depth_reached = 0
+        self.best_score = 0
+        self.move_scores = {}
+        self.nodes = 0  # Total of all the workers
+        self.table_hits = 0
+
+    def _get_executor(self):
+        if self.executor is None:
+            # Workers are spawned rather than forked, forking the Tk process
+            # of the interface isn't safe
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.table_size_mb,)
+            )
+        return self.executor
+
+    def search(self, bitboard, player):
+        """Returns the best column for `player` on the given position"""
+        center = bitboard.columns // 2
+        moves = sorted((col for col in range(bitboard.columns) if bitboard.can_play(col)),
+                       key=lambda col: abs(col - center))
+        if not moves:
+            return None
+        if len(moves) == 1:
+            return moves[0]
+
+        executor = self._get_executor()
+        start = time.perf_counter()
+        # With fewer workers than moves, the tasks run in several rounds
+        rounds = -(-len(moves) // self.workers)
+        task_time = self.time_limit / rounds if self.time_limit else None
+        futures = [
+            executor.submit(_search_move, bitboard.rows, bitboard.columns, bitboard.connect, list(bitboard.moves),
+                            player, col, task_time, self.max_depth)
+            for col in moves
+        ]
+        results = {}
+        self.nodes = 0
+        self.table_hits = 0
+        pending = set(futures)
+        while pending:
+            # Wake up regularly to notice a cancellation
+            done, pending = wait(pending, timeout=AI_POLL_INTERVAL / 1000, return_when=FIRST_COMPLETED)
+            for future in done:
+                column, scores, proven, nodes, table_hits = future.result()
+                results[column] = (scores, proven)
+                self.nodes += nodes
+                self.table_hits += table_hits
+            if self.cancel is not None and self.cancel.is_set():
+                # The tasks already running finish in their worker on their own
+                for future in pending:
+                    future.cancel()
+                break
+        self.elapsed = time.perf_counter() - start
+        if not results:
+            # Cancelled before any move was searched
+            self.move_scores = {}
+            self.depth_reached = 0
+            self.best_score = 0
+            return moves[0]
+        # Only the searched moves are compared after a cancellation
+        moves = [column for column in moves if column in results]
+
+        # Compare all the moves at the deepest depth they all completed
+        depth = min((len(scores) for scores, proven in results.values() if not proven), default=0)
+        self.move_scores = {}
+        for column in moves:
+            scores, proven = results[column]
+            if proven:
+                self.move_scores[column] = scores[-1]
+            elif depth > 0:
+                self.move_scores[column] = scores[depth - 1]
+            else:
+                self.move_scores[column] = 0  # Not even searched to depth 1
+        # A move's subtree is one ply below the root
+        self.depth_reached = depth + 1
+        best = max(moves, key=lambda col: self.move_scores[col])  # First of the center order on ties
+        self.best_score = self.move_scores[best]
+        return best
+
+    def shutdown(self):
+        """Stops the worker processes"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,52 @@
+import numpy as np
+from constants import *
+
+
+class LearnedPatterns:
+    """
+    Cells played in the games won by each player, as one array of counts
+    per player with the shape of the board.
+
+    Every move of a won game adds one to its cell in the winner's array, so
+    the memory used doesn't depend on the length of the history and a
+    lookup is a plain array index. With a `half_life`, all the counts are
+    halved every `half_life` recorded wins, so that old games weigh less.
+    """
+
+    def __init__(self, rows=ROWS, columns=COLUMNS, half_life=PATTERN_HALF_LIFE):
+        self.rows = rows
+        self.columns = columns
+        self.half_life = half_life
+        self.counts = {
+            PLAYER_X: np.zeros((rows, columns), dtype=np.int64),
+            PLAYER_O: np.zeros((rows, columns), dtype=np.int64)
+        }
+        self.moves = {PLAYER_X: 0, PLAYER_O: 0}  # Moves recorded for each player
+        self.wins = 0  # Won games recorded since the last halving
+        self.version = 0  # Changes on every update, for the caches of the counts
+
+    def add_game(self, winner, moves):
+        """Records the moves (row, column) of a game won by `winner`"""
+        if winner not in self.counts:
+            return
+        counts = self.counts[winner]
+        for row, col in moves:
+            if 0 <= row < self.rows and 0 <= col < self.columns:
+                counts[row, col] += 1
+        self.moves[winner] += len(moves)
+        self.version += 1
+        if self.half_life:
+            self.wins += 1
+            if self.wins >= self.half_life:
+                for player_counts in self.counts.values():
+                    player_counts >>= 1
+                self.wins = 0
+
+    def is_empty(self):
+        return not (self.counts[PLAYER_X].any() or self.counts[PLAYER_O].any())
+
+    def top_positions(self, player, n=5):
+        """The n most frequent cells of `player`, as [((row, column), count)]"""
+        flat = self.counts[player].ravel()
+        order = np.argsort(-flat, kind='stable')[:n]
+        return [(divmod(int(index), self.columns), int(flat[index])) for index in order if flat[index] > 0]
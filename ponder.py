@@ -0,0 +1,93 @@
+import threading
+import time
+from constants import *
+from move_ordering import MoveOrderer
+from search import NegamaxSearch
+
+
+class Ponderer:
+    """
+    Searches the AI replies to the likely moves of the human while the human
+    is thinking, in a background thread.
+
+    Each candidate move of the human is searched with the budget of the
+    expert level, sharing the transposition table of the game, and the best
+    reply is kept by position hash: when the human plays one of these moves,
+    the AI answers at once. The thread only runs `cpu_share` of the time
+    (it sleeps in between searches), keeps at most `max_positions` replies
+    and never allocates a table of its own. stop() cancels it within a few
+    hundred nodes.
+    """
+
+    def __init__(self, table, cpu_share=PONDER_CPU_SHARE, max_positions=PONDER_MAX_POSITIONS):
+        self.table = table
+        self.cpu_share = cpu_share
+        self.max_positions = max_positions
+        self.cancel = threading.Event()
+        self.search = NegamaxSearch(table=table)
+        self.search.cancel = self.cancel
+        self.orderer = MoveOrderer()
+        self.replies = {}  # Zobrist hash of a position -> (tokens on the board, best reply)
+        self.thread = None
+        # Information about the pondering so far
+        self.searched = 0
+        self.hits = 0
+
+    def start(self, bitboard, player, search):
+        """
+        Starts pondering the moves of `player` on the position, with the
+        budget of `search` (the expert search of the game) for each reply
+        """
+        self.stop()
+        # The positions with no more tokens than this one can't come back in
+        # the game, their replies would only fill the max_positions budget
+        self.replies = {key: entry for key, entry in self.replies.items() if entry[0] > bitboard.move_count}
+        self.search.time_limit = search.time_limit
+        self.search.node_limit = search.node_limit
+        self.search.max_depth = search.max_depth
+        self.cancel.clear()
+        self.thread = threading.Thread(target=self._run, args=(bitboard.copy(), player), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Cancels the pondering and waits for the thread to give the table back"""
+        if self.thread is None:
+            return
+        self.cancel.set()
+        self.thread.join()
+        self.thread = None
+
+    def clear(self):
+        self.stop()
+        self.replies = {}
+
+    def lookup(self, bitboard):
+        """Returns the pondered reply for the position, or None"""
+        entry = self.replies.get(bitboard.hash)
+        if entry is not None and entry[0] == bitboard.move_count and bitboard.can_play(entry[1]):
+            self.hits += 1
+            return entry[1]
+        return None
+
+    def _run(self, board, player):
+        opponent = PLAYER_X if player == PLAYER_O else PLAYER_O
+        self.orderer = self.orderer.for_board(board)
+        # The most likely moves of the human first
+        for column in self.orderer.order(board, player, 0):
+            if self.cancel.is_set() or len(self.replies) >= self.max_positions:
+                return
+            board.play(column, player)
+            if not board.last_move_wins() and not board.is_full() and board.hash not in self.replies:
+                start = time.perf_counter()
+                reply = self.search.search(board, opponent)
+                elapsed = time.perf_counter() - start
+                if self.cancel.is_set():
+                    # The last search was cut short, its reply isn't reliable
+                    board.undo()
+                    return
+                if reply is not None:
+                    self.replies[board.hash] = (board.move_count, reply)
+                    self.searched += 1
+                # Idle long enough to keep the average CPU use at cpu_share
+                self.cancel.wait(elapsed * (1 - self.cpu_share) / self.cpu_share)
+            board.undo()
@@ -0,0 +1,51 @@
+from constants import *
+from bitboard import BitBoard
+from threats import ThreatMap
+
+
+class Position:
+    """
+    State of the board only: the bitboard, its threat map and the grid
+    mirror read by the interface and the evaluation functions.
+
+    make() and unmake() play and cancel a move on all three in constant
+    time, the column heights of the bitboard giving the landing row. The
+    session state of a game (scores, timer, player to move, recorded moves)
+    stays in Connect4, so trying moves never touches it.
+    """
+
+    __slots__ = ('rows', 'columns', 'connect', 'bitboard', 'threats', 'grid')
+
+    def __init__(self, rows=ROWS, columns=COLUMNS, connect=CONNECT):
+        self.rows = rows
+        self.columns = columns
+        self.connect = connect
+        self.bitboard = BitBoard(rows, columns, connect)
+        self.threats = ThreatMap(self.bitboard)
+        self.grid = [[EMPTY] * columns for _ in range(rows)]
+
+    def can_play(self, column):
+        return self.bitboard.can_play(column)
+
+    def make(self, column, player):
+        """Drops a token for `player` in `column` and returns its row"""
+        row = self.threats.play(column, player)
+        self.grid[row][column] = player
+        return row
+
+    def unmake(self):
+        """Cancels the last move and returns (player, column, row)"""
+        player, column, row = self.threats.undo()
+        self.grid[row][column] = EMPTY
+        return player, column, row
+
+    def copy(self):
+        """Independent copy of the position, its moves can't be unmade"""
+        other = Position.__new__(Position)
+        other.rows = self.rows
+        other.columns = self.columns
+        other.connect = self.connect
+        other.bitboard = self.bitboard.copy()
+        other.threats = ThreatMap(other.bitboard)
+        other.grid = [list(row) for row in self.grid]
+        return other
@@ -0,0 +1,197 @@
+"""
+Compact binary format of the game records.
+
+A record file starts with a header, followed by one record per game:
+
+    header : magic "C4GR", version, rows, columns (1 byte each)
+    record : timestamp (4 bytes, seconds since the epoch), duration
+             (4 bytes, hundredths of a second), winner (1 byte: N, X, O),
+             number of moves (2 bytes), then the columns played, two per
+             byte when the board has at most 16 columns, one per byte otherwise
+
+Rows aren't stored, they follow from the columns played. A 42-move game
+takes 32 bytes, about ten times less than in the CSV stats files. Convert
+a CSV stats file with:
+
+    python records.py stats.csv stats.c4r
+"""
+import argparse
+import ast
+import csv
+import os
+import struct
+import time
+from datetime import datetime
+from constants import *
+
+MAGIC = b'C4GR'
+VERSION = 1
+HEADER = struct.Struct('<4sBBB')
+RECORD = struct.Struct('<IIBH')
+WINNERS = ('N', PLAYER_X, PLAYER_O)
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Columns of the two moves packed in each byte
+_NIBBLES = [bytes((value & 0xF, value >> 4)) for value in range(256)]
+
+
+def packs_nibbles(columns):
+    return columns <= 16
+
+
+def encode_game(winner, duration, moves, timestamp, nibbles=True):
+    """Record of a game, `moves` being the columns played"""
+    if nibbles:
+        packed = bytes(moves[i] | (moves[i + 1] << 4 if i + 1 < len(moves) else 0)
+                       for i in range(0, len(moves), 2))
+    else:
+        packed = bytes(moves)
+    return RECORD.pack(int(timestamp), int(round(duration * 100)), WINNERS.index(winner), len(moves)) + packed
+
+
+def replay(moves, rows):
+    """The (row, column) cells of the columns played, as in Connect4.game_moves"""
+    heights = {}
+    cells = []
+    for column in moves:
+        height = heights.get(column, 0)
+        heights[column] = height + 1
+        cells.append((rows - 1 - height, column))
+    return cells
+
+
+def read_header(f):
+    data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise ValueError("truncated header")
+    magic, version, rows, columns = HEADER.unpack(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a game record file")
+    return rows, columns
+
+
+def read_records(path):
+    """
+    Reads a record file. Returns (rows, columns, records, size): records
+    are (timestamp, winner, duration, moves) tuples with the columns played
+    as bytes, size is the length of the complete records (a record cut by
+    an interrupted write is left out).
+    """
+    with open(path, 'rb') as f:
+        rows, columns = read_header(f)
+        data = f.read()
+    nibbles = packs_nibbles(columns)
+    records = []
+    offset = 0
+    end = len(data)
+    unpack = RECORD.unpack_from
+    while offset + RECORD.size <= end:
+        timestamp, duration, winner, count = unpack(data, offset)
+        start = offset + RECORD.size
+        length = (count + 1) // 2 if nibbles else count
+        if start + length > end:
+            break
+        packed = data[start:start + length]
+        if nibbles:
+            moves = b''.join([_NIBBLES[value] for value in packed])[:count]
+        else:
+            moves = packed
+        records.append((timestamp, WINNERS[winner], duration / 100, moves))
+        offset = start + length
+    return rows, columns, records, HEADER.size + offset
+
+
+class RecordWriter:
+    """Appends games to a record file, creating it if needed"""
+
+    def __init__(self, path, rows=ROWS, columns=COLUMNS):
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                self.rows, self.columns = read_header(f)
+        else:
+            self.rows, self.columns = rows, columns
+            with open(path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, rows, columns))
+        self.nibbles = packs_nibbles(self.columns)
+        self.file = open(path, 'ab')
+
+    def append(self, winner, duration, moves, timestamp=None):
+        """Adds a game, `moves` being the columns played"""
+        timestamp = time.time() if timestamp is None else timestamp
+        self.file.write(encode_game(winner, duration, moves, timestamp, self.nibbles))
+
+    def flush(self, fsync=False):
+        self.file.flush()
+        if fsync:
+            os.fsync(self.file.fileno())
+
+    def truncate(self, size):
+        """Cuts the file after its first `size` bytes"""
+        self.file.flush()
+        self.file.truncate(size)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def convert_csv(csv_path, output, rows=ROWS, columns=COLUMNS):
+    """
+    Writes the games of a CSV stats file as a record file. A game is only
+    kept when replaying its columns gives back its stored (row, column)
+    moves, as the rows aren't stored. Returns the number of games written
+    and the skipped ones, as [(line number, reason)].
+    """
+    count = 0
+    skipped = []
+    with open(csv_path, newline='') as f, RecordWriter(output, rows, columns) as writer:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                moves = [tuple(move) for move in ast.literal_eval(row['coups'])] if row.get('coups') else []
+                played = [column for _, column in moves]
+                timestamp = datetime.strptime(row['date'], DATE_FORMAT).timestamp()
+                duration = float(row['duree']) if row.get('duree') else 0.0
+            except (SyntaxError, ValueError, TypeError) as e:
+                skipped.append((reader.line_num, f"invalid row: {e}"))
+                continue
+            if row['gagnant'] not in WINNERS:
+                skipped.append((reader.line_num, f"unknown winner {row['gagnant']!r}"))
+                continue
+            if any(not 0 <= column < columns for column in played) or replay(played, rows) != moves:
+                skipped.append((reader.line_num, "the moves can't be replayed from their columns"))
+                continue
+            writer.append(row['gagnant'], duration, played, timestamp)
+            count += 1
+        writer.flush(fsync=True)
+    return count, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a CSV stats file to the binary record format")
+    parser.add_argument('csv', help="CSV stats file to convert")
+    parser.add_argument('output', help="record file to write")
+    parser.add_argument('--rows', type=int, default=ROWS)
+    parser.add_argument('--columns', type=int, default=COLUMNS)
+    args = parser.parse_args()
+
+    if os.path.exists(args.output):
+        parser.error(f"{args.output} already exists")
+    start = time.perf_counter()
+    count, skipped = convert_csv(args.csv, args.output, args.rows, args.columns)
+    print(f"{count} games written to {args.output} in {time.perf_counter() - start:.1f}s "
+          f"({os.path.getsize(args.csv)} -> {os.path.getsize(args.output)} bytes)")
+    if skipped:
+        print(f"{len(skipped)} games skipped:")
+        for line, reason in skipped:
+            print(f"  line {line}: {reason}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import time
+from constants import *
+from transposition import EXACT, LOWER_BOUND, UPPER_BOUND
+from move_ordering import MoveOrderer
+
+# Score of a won position, reduced by the number of plies needed to win so
+# that the search prefers the fastest win and the slowest loss
+WIN_SCORE = 1000000
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time or node budget is exhausted"""
+
+
+class NegamaxSearch:
+    """
+    Negamax search with alpha-beta pruning and iterative deepening.
+
+    The search works on a copy of a BitBoard and deepens one ply at a time
+    until the time budget (in seconds) or the node budget is spent. The move
+    returned is the best move of the last fully searched depth. An optional
+    TranspositionTable keeps results between iterations and between moves,
+    and a MoveOrderer decides in which order the moves are searched.
+    """
+
+    def __init__(self, time_limit=AI_TIME_LIMIT, node_limit=None, max_depth=None, table=None,
+                 orderer=None):
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.max_depth = max_depth
+        self.table = table
+        self.orderer = orderer if orderer is not None else MoveOrderer()
+        # Information about the last search
+        self.nodes = 0
+        self.depth_reached = 0
+        self.best_score = 0
+        self.depth_scores = []  # Best score of each completed depth
+        self.table_hits = 0  # Transposition table hits
+        # Optional threading.Event: once set, the search stops like on timeout
+        self.cancel = None
+
+    def search(self, bitboard, player):
+        """Returns the best column for `player` on the given position"""
+        board = bitboard.copy()
+        opponent = PLAYER_X if player == PLAYER_O else PLAYER_O
+        # The orderer only tries the columns it was built for
+        self.orderer = self.orderer.for_board(board)
+        self.orderer.new_search()
+        moves = self.orderer.order(board, player, 0)
+        if not moves:
+            return None
+
+        self.nodes = 0
+        self.depth_reached = 0
+        self.best_score = 0
+        self.depth_scores = []
+        self.table_hits = 0
+        self.deadline = time.perf_counter() + self.time_limit if self.time_limit else None
+        if self.table is not None:
+            self.table.new_search()
+            hits = self.table.hits
+
+        best_move = moves[0]
+        remaining = board.rows * board.columns - board.move_count
+        max_depth = min(self.max_depth or remaining, remaining)
+        for depth in range(1, max_depth + 1):
+            try:
+                score, move = self._search_root(board, player, opponent, moves, depth)
+            except SearchTimeout:
+                # Unwind the moves of the interrupted iteration
+                while board.move_count > bitboard.move_count:
+                    board.undo()
+                break
+            best_move = move
+            self.best_score = score
+            self.depth_reached = depth
+            self.depth_scores.append(score)
+            # Search the best move first at the next depth
+            moves.remove(move)
+            moves.insert(0, move)
+            # A forced result has been found, deeper searches can't change it
+            if abs(score) >= WIN_SCORE - board.rows * board.columns:
+                break
+        if self.table is not None:
+            self.table_hits = self.table.hits - hits
+        return best_move
+
+    def _search_root(self, board, player, opponent, moves, depth):
+        alpha = -WIN_SCORE - 1
+        beta = WIN_SCORE + 1
+        best_move = moves[0]
+        for column in moves:
+            board.play(column, player)
+            if board.last_move_wins():
+                score = WIN_SCORE - board.move_count
+            else:
+                score = -self._negamax(board, opponent, player, depth - 1, 1, -beta, -alpha)
+            board.undo()
+            if score > alpha:
+                alpha = score
+                best_move = column
+        return alpha, best_move
+
+    def _negamax(self, board, player, opponent, depth, ply, alpha, beta):
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self._check_budget()
+
+        if board.is_full():
+            return 0
+        if depth == 0:
+            return self.evaluate(board, player, opponent)
+
+        # An immediate win ends the search of this position
+        winning = board.winning_cells(player) & board.playable_cells()
+        if winning:
+            return WIN_SCORE - board.move_count - 1
+
+        # Reuse the result of a previous search of the same position
+        original_alpha = alpha
+        stored_move = None
+        if self.table is not None:
+            entry = self.table.probe(board.hash)
+            if entry is not None:
+                stored_score, stored_depth, flag, stored_move = entry
+                if stored_depth >= depth:
+                    if flag == EXACT:
+                        return stored_score
+                    if flag == LOWER_BOUND:
+                        alpha = max(alpha, stored_score)
+                    else:
+                        beta = min(beta, stored_score)
+                    if alpha >= beta:
+                        return stored_score
+
+        best_score = -WIN_SCORE - 1
+        best_move = None
+        moves = self.orderer.order(board, player, ply, stored_move, depth)
+        for index, column in enumerate(moves):
+            board.play(column, player)
+            score = -self._negamax(board, opponent, player, depth - 1, ply + 1, -beta, -alpha)
+            board.undo()
+            if score > best_score:
+                best_score = score
+                best_move = column
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                self.orderer.record_cutoff(board, player, column, ply, depth, index)
+                break
+
+        if self.table is not None:
+            if best_score <= original_alpha:
+                flag = UPPER_BOUND
+            elif best_score >= beta:
+                flag = LOWER_BOUND
+            else:
+                flag = EXACT
+            self.table.store(board.hash, best_score, depth, flag, best_move)
+        return best_score
+
+    def _check_budget(self):
+        if self.cancel is not None and self.cancel.is_set():
+            raise SearchTimeout()
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchTimeout()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+    def evaluate(self, board, player, opponent):
+        """Heuristic score of a position, from the point of view of `player`"""
+        own = board.winning_cells(player)
+        other = board.winning_cells(opponent)
+        score = 4 * (bin(own).count('1') - bin(other).count('1'))
+        # Threats that can be played right away matter most
+        playable = board.playable_cells()
+        score += 8 * (bin(own & playable).count('1') - bin(other & playable).count('1'))
+        # Tokens in the center column take part in more alignments
+        center = ((1 << board.rows) - 1) << (board.columns // 2 * board.stride)
+        score += 3 * (bin(board.bits[player] & center).count('1')
+                      - bin(board.bits[opponent] & center).count('1'))
+        return score
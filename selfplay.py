@@ -0,0 +1,162 @@
+"""
+Headless AI-vs-AI self-play: plays games between two AI levels without the
+interface, spread across a pool of worker processes.
+
+Each worker keeps one Connect4 for all its games, so the search tables stay
+warm and nothing is written to disk while the games run. The learned
+patterns are read once by the main process and sent to the workers, which
+never open the stats file themselves. The results are written in one go
+at the end. From the command line:
+
+    python selfplay.py --games 200 --x 2 --o 3 --workers 4 --time 0.1
+
+or from Python:
+
+    from selfplay import run_selfplay
+    summary = run_selfplay(200, level_x=2, level_o=3, workers=4, time_limit=0.1)
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from constants import *
+from game import Connect4
+from mcts import MCTS
+from stats import CSVStatsManager, creer_stats_manager
+
+LEVEL_NAMES = {1: 'moderate', 2: 'advanced', 3: 'expert', 4: 'perfect', 5: 'MCTS'}
+
+# Game of each worker process, created once by the pool initializer
+_worker_game = None
+
+
+def _init_worker(rows, columns, connect, time_limit, learned_patterns):
+    global _worker_game
+    game = Connect4(rows, columns, connect, learned_patterns=learned_patterns)
+    # The games are already spread across processes
+    game.parallel_search = None
+    if time_limit is not None:
+        game.search.time_limit = time_limit
+        # The perfect level gets the same budget, then falls back to the search
+        game.solver.time_limit = time_limit
+        if game.mcts is not None:
+            game.mcts.time_limit = time_limit
+    _worker_game = game
+
+
+def _play_game(task):
+    """Worker task: plays one game, returns its result as a dictionary"""
+    level_x, level_o, seed = task
+    game = _worker_game
+    random.seed(seed)
+    if game.mcts is not None:
+        game.mcts = MCTS(time_limit=game.mcts.time_limit, seed=seed)
+    game.reset_game()
+    levels = {PLAYER_X: level_x, PLAYER_O: level_o}
+    start = time.perf_counter()
+    winner = 'N'
+    while True:
+        game.ai_level = levels[game.current_player]
+        column = game.choose_best_move()
+        if column is None:
+            break
+        result = game.place_token(column)
+        if not result:
+            raise RuntimeError(f"Level {game.ai_level} chose the full column {column}")
+        if result == 'victory':
+            winner = game.current_player
+            break
+        if result == 'draw':
+            break
+        game.change_player()
+    return {
+        'gagnant': winner,
+        'duree': round(time.perf_counter() - start, 2),
+        'coups': list(game.game_moves)
+    }
+
+
+def run_selfplay(games, level_x, level_o, workers=None, time_limit=None, seed=0,
+                 rows=ROWS, columns=COLUMNS, connect=CONNECT, output=None):
+    """
+    Plays `games` games, level_x playing X (first) and level_o playing O.
+    Game i is seeded with seed + i. With workers=1 the games are played in
+    this process. If `output` is given, the games are added to that stats
+    CSV file in a single write.
+    Returns a summary with the wins of each side, the game records and the
+    number of games per second.
+    """
+    workers = workers or os.cpu_count() or 1
+    # Only this process reads the stats file
+    stats_manager = creer_stats_manager(rows, columns, connect)
+    learned_patterns = stats_manager.analyser_historique_victoires(rows, columns)
+    stats_manager.fermer()
+    tasks = [(level_x, level_o, seed + i) for i in range(games)]
+    start = time.perf_counter()
+    if workers == 1:
+        _init_worker(rows, columns, connect, time_limit, learned_patterns)
+        records = [_play_game(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(rows, columns, connect, time_limit, learned_patterns)
+        ) as executor:
+            chunksize = max(1, games // (workers * 4))
+            records = list(executor.map(_play_game, tasks, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    if output:
+        manager = CSVStatsManager(output)
+        try:
+            manager.ajouter_parties(records)
+        finally:
+            # Forces the games to disk per the fsync policy, waits for a segment compression
+            manager.fermer()
+
+    results = {PLAYER_X: 0, PLAYER_O: 0, 'N': 0}
+    for record in records:
+        results[record['gagnant']] += 1
+    return {
+        'games': games,
+        'level_x': level_x,
+        'level_o': level_o,
+        'results': results,
+        'average_moves': round(sum(len(r['coups']) for r in records) / games, 1) if games else 0,
+        'seconds': round(elapsed, 2),
+        'games_per_second': round(games / elapsed, 2) if elapsed > 0 else 0,
+        'records': records
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play AI-vs-AI Connect 4 games without the interface")
+    parser.add_argument('--games', type=int, default=100, help="number of games to play")
+    parser.add_argument('--x', type=int, default=1, choices=sorted(LEVEL_NAMES), help="AI level of X, who starts")
+    parser.add_argument('--o', type=int, default=2, choices=sorted(LEVEL_NAMES), help="AI level of O")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument('--time', type=float, default=None, help="thinking time per move of the search, perfect and MCTS levels")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game")
+    parser.add_argument('--rows', type=int, default=ROWS)
+    parser.add_argument('--columns', type=int, default=COLUMNS)
+    parser.add_argument('--connect', type=int, default=CONNECT)
+    parser.add_argument('--output', default=None, help="stats CSV file to add the games to")
+    args = parser.parse_args()
+
+    summary = run_selfplay(args.games, args.x, args.o, workers=args.workers, time_limit=args.time,
+                           seed=args.seed, rows=args.rows, columns=args.columns, connect=args.connect,
+                           output=args.output)
+    results = summary['results']
+    print(f"{summary['games']} games, X {LEVEL_NAMES[args.x]} vs O {LEVEL_NAMES[args.o]}: "
+          f"X {results[PLAYER_X]} wins, O {results[PLAYER_O]} wins, {results['N']} draws")
+    print(f"{summary['average_moves']} moves per game, {summary['seconds']}s, "
+          f"{summary['games_per_second']} games/s")
+    if args.output:
+        print(f"Games added to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
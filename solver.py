@@ -0,0 +1,231 @@
+import time
+from constants import *
+from bitboard import completing_cells
+
+
+class SolverTimeout(Exception):
+    """Raised when the solver exhausts its time or node budget"""
+
+
+class Solver:
+    """
+    Perfect-play solver: computes the game-theoretic value of a position.
+
+    Scores follow the usual convention of Connect 4 solvers: 0 for a draw,
+    a positive score if the player to move wins, a negative one if they lose.
+    The further the end of the game, the smaller the absolute score: the
+    winner ends the game having played (cells / 2 + 1 - |score|) tokens.
+
+    The search is a null-window negamax with alpha-beta pruning on raw
+    integer bitboards, using the classic pruning of 7x6 solvers:
+    - losing moves are never explored (moves that let the opponent win
+      right away, or that don't block one of its immediate wins)
+    - the score is bounded by the number of moves left in the game
+    - a transposition table of upper bounds, with a fixed number of slots
+    - moves creating the most winning cells are explored first
+    """
+
+    def __init__(self, rows=ROWS, columns=COLUMNS, connect=CONNECT, table_size=SOLVER_TABLE_SIZE,
+                 time_limit=SOLVER_TIME_LIMIT, node_limit=None):
+        self.rows = rows
+        self.columns = columns
+        self.connect = connect
+        self.stride = rows + 1
+        self.cells = rows * columns
+        self.bottom_mask = 0
+        for col in range(columns):
+            self.bottom_mask |= 1 << (col * self.stride)
+        self.board_mask = self.bottom_mask * ((1 << rows) - 1)
+        self.column_masks = [((1 << rows) - 1) << (col * self.stride) for col in range(columns)]
+        center = columns // 2
+        self.column_order = sorted(range(columns), key=lambda col: abs(col - center))
+        # The fastest win takes `connect` tokens
+        self.min_score = -(self.cells // 2) + connect - 1
+        self.max_score = (self.cells + 1) // 2 - connect + 1
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        # Transposition table: slot = key % size, keeps the last entry only
+        self.table_size = table_size
+        self.reset_table()
+        self.nodes = 0
+        self.hits = 0  # Transposition table hits of the last solve
+        # Optional threading.Event: once set, the solve stops like on timeout
+        self.cancel = None
+
+    def reset_table(self):
+        """Empties the transposition table"""
+        # Keys are never negative, -1 marks a free slot
+        self.table_keys = [-1] * self.table_size
+        self.table_values = [0] * self.table_size
+
+    def solve(self, bitboard, player):
+        """Returns the score of the position for `player`, the player to move"""
+        position, mask, moves = self._raw_position(bitboard, player)
+        self._start()
+        return self._solve(position, mask, moves)
+
+    def analyze(self, bitboard, player):
+        """
+        Solves the position and finds an optimal move.
+        Returns a dictionary with the result ('win', 'loss' or 'draw'), the
+        number of plies until the end of the game with perfect play, the
+        score and the best column.
+        """
+        position, mask, moves = self._raw_position(bitboard, player)
+        self._start()
+        score = self._solve(position, mask, moves)
+        best_move = self._best_move(position, mask, moves, score)
+
+        if score > 0:
+            # Tokens still to play by the player to move, the last one wins
+            remaining = self.cells // 2 + 1 - score - moves // 2
+            distance = 2 * remaining - 1
+            result = 'win'
+        elif score < 0:
+            remaining = self.cells // 2 + 1 + score - (moves + 1) // 2
+            distance = 2 * remaining
+            result = 'loss'
+        else:
+            distance = self.cells - moves
+            result = 'draw'
+        return {'result': result, 'distance': distance, 'score': score, 'move': best_move}
+
+    def _raw_position(self, bitboard, player):
+        if (bitboard.rows, bitboard.columns, bitboard.connect) != (self.rows, self.columns, self.connect):
+            raise ValueError("The solver was built for another board geometry")
+        return bitboard.bits[player], bitboard.mask, bitboard.move_count
+
+    def _start(self):
+        self.nodes = 0
+        self.hits = 0
+        self.deadline = time.perf_counter() + self.time_limit if self.time_limit else None
+
+    def _solve(self, position, mask, moves):
+        if self._winning_cells(position, mask) & self._possible(mask):
+            return (self.cells + 1 - moves) // 2
+        low = -((self.cells - moves) // 2)
+        high = (self.cells + 1 - moves) // 2
+        # Null-window searches, dichotomy on the score biased towards 0
+        while low < high:
+            middle = low + (high - low) // 2
+            if middle <= 0 and int(low / 2) < middle:
+                middle = int(low / 2)
+            elif middle >= 0 and int(high / 2) > middle:
+                middle = int(high / 2)
+            score = self._negamax(position, mask, moves, middle, middle + 1)
+            if score <= middle:
+                high = score
+            else:
+                low = score
+        return low
+
+    def _best_move(self, position, mask, moves, score):
+        """Returns a column reaching `score`, or None if the board is full"""
+        possible = self._possible(mask)
+        winning = self._winning_cells(position, mask) & possible
+        candidates = [col for col in self.column_order if possible & self.column_masks[col]]
+        for col in candidates:
+            move = possible & self.column_masks[col]
+            if winning & move:
+                return col
+        for col in candidates:
+            move = possible & self.column_masks[col]
+            child_mask = mask | move
+            # The opponent's view of the child position
+            child = position ^ mask
+            if self._winning_cells(child, child_mask) & self._possible(child_mask):
+                # The opponent wins right away after this move
+                if -((self.cells - moves) // 2) == score:
+                    return col
+                continue
+            if moves + 1 >= self.cells:
+                return col
+            # The move is optimal if the child is worth at most -score to the opponent
+            if self._negamax(child, child_mask, moves + 1, -score, -score + 1) <= -score:
+                return col
+        return candidates[0] if candidates else None
+
+    def _negamax(self, position, mask, moves, alpha, beta):
+        self.nodes += 1
+        if self.nodes & 4095 == 0:
+            self._check_budget()
+
+        possible = self._possible(mask)
+        opponent = position ^ mask
+        opponent_wins = self._winning_cells(opponent, mask)
+        forced = possible & opponent_wins
+        if forced:
+            if forced & (forced - 1):
+                # Two immediate threats can't both be blocked
+                return -((self.cells - moves) // 2)
+            possible = forced
+        # Never play right under an opponent's winning cell
+        non_losing = possible & ~(opponent_wins >> 1)
+        if not non_losing:
+            return -((self.cells - moves) // 2)
+        if moves >= self.cells - 2:
+            return 0
+
+        # We can't lose within our next move, so the score has a lower bound
+        lower = -((self.cells - 2 - moves) // 2)
+        if alpha < lower:
+            alpha = lower
+            if alpha >= beta:
+                return alpha
+        # We can't win at our next move either
+        upper = (self.cells - 1 - moves) // 2
+        key = position + mask
+        slot = key % self.table_size
+        if self.table_keys[slot] == key:
+            self.hits += 1
+            upper = self.table_values[slot] + self.min_score - 1
+        if beta > upper:
+            beta = upper
+            if alpha >= beta:
+                return beta
+
+        # Explore first the moves creating the most winning cells
+        ordered = []
+        for col in self.column_order:
+            move = non_losing & self.column_masks[col]
+            if move:
+                threats = bin(self._winning_cells(position | move, mask)).count('1')
+                ordered.append((threats, move))
+        ordered.sort(key=lambda entry: entry[0], reverse=True)
+
+        for _, move in ordered:
+            score = -self._negamax(opponent, mask | move, moves + 1, -beta, -alpha)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+
+        self.table_keys[slot] = key
+        self.table_values[slot] = alpha - self.min_score + 1
+        return alpha
+
+    def _check_budget(self):
+        if self.cancel is not None and self.cancel.is_set():
+            raise SolverTimeout()
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SolverTimeout()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SolverTimeout()
+
+    def _possible(self, mask):
+        return (mask + self.bottom_mask) & self.board_mask
+
+    def _winning_cells(self, position, mask):
+        """Empty cells completing an alignment for the tokens in `position`"""
+        if self.connect != 4:
+            return completing_cells(position, self.board_mask ^ mask, self.stride, self.connect)
+        stride = self.stride
+        cells = (position << 1) & (position << 2) & (position << 3)
+        for shift in (stride, stride + 1, stride - 1):
+            pair = (position << shift) & (position << (2 * shift))
+            cells |= pair & (position << (3 * shift))
+            cells |= pair & (position >> shift)
+            pair = (position >> shift) & (position >> (2 * shift))
+            cells |= pair & (position << shift)
+            cells |= pair & (position >> (3 * shift))
+        return cells & (self.board_mask ^ mask)
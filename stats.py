@@ -1,8 +1,39 @@
 import json
 import os
+import time
+import threading
+import gzip
+import shutil
+import sqlite3
 from datetime import datetime
+import ast
 import csv
-import pandas as pd
+from constants import *
+from patterns import LearnedPatterns
+from records import HEADER, RecordWriter, read_records, replay
+
+# Colonnes des fichiers CSV de statistiques
+EN_TETE = ['date', 'gagnant', 'duree', 'coups']
+
+
+def lire_coups(coups):
+    """
+    Convertit les coups enregistrés d'une partie en liste de (ligne, colonne)
+    Renvoie None si la partie n'a pas de coups valides
+    """
+    # Parties sans coups : valeur absente, vide ou NaN
+    if coups is None or isinstance(coups, (float, int)) or coups == 'nan':
+        return None
+    if isinstance(coups, str):
+        # Le format est quelque chose comme "[(0, 1), (1, 2), ...]"
+        try:
+            coups = ast.literal_eval(coups)
+        except (SyntaxError, ValueError):
+            print(f"Format de coups invalide: {coups}")
+            return None
+    if not isinstance(coups, list):
+        return None
+    return coups
 
 class StatsManager:
     def __init__(self, filename="stats.json"):
@@ -89,58 +120,45 @@ class StatsManager:
         self.sauvegarder_stats()
         return self.stats 
 
-    def analyser_historique_victoires(self):
-        """Analyse l'historique des parties pour identifier les patterns gagnants"""
-        historique = self.stats['historique']
-        patterns = {
-            'X': {'coups': [], 'frequence': {}},  # Patterns du joueur
-            'O': {'coups': [], 'frequence': {}}   # Patterns de l'IA
-        }
-        
-        # Analyser chaque partie gagnante
-        for partie in historique:
+    def analyser_historique_victoires(self, rows=ROWS, columns=COLUMNS):
+        """
+        Analyse l'historique des parties pour identifier les patterns gagnants
+        Renvoie un LearnedPatterns : nombre de coups par case dans les parties gagnées
+        """
+        patterns = LearnedPatterns(rows, columns)
+        for partie in self.stats['historique']:
             if partie['gagnant'] in ['X', 'O']:
-                # Ajouter l'analyse des coups de cette partie
-                if 'coups' in partie:  # Si les coups ont été enregistrés
+                coups = lire_coups(partie.get('coups'))
+                if coups:
                     try:
-                        # Convertir de string à liste si nécessaire
-                        coups = partie['coups']
-                        
-                        # Vérifier le type de coups
-                        if isinstance(coups, (float, int)) or coups == 'nan':
-                            # Skip this entry - it's a number or NaN, not a list
-                            continue
-                            
-                        if isinstance(coups, str):
-                            # Le format sera quelque chose comme "[(0, 1), (1, 2), ...]"
-                            try:
-                                import ast
-                                coups = ast.literal_eval(coups)
-                                # Vérifier que c'est bien une liste
-                                if not isinstance(coups, list):
-                                    continue
-                            except (SyntaxError, ValueError):
-                                # Si la conversion échoue, ignorer cette entrée
-                                print(f"Format de coups invalide: {coups}")
-                                continue
-                        
-                        # Maintenant que nous avons une liste valide, traiter les coups
-                        patterns[partie['gagnant']]['coups'].extend(coups)
-                        
-                        # Compter la fréquence des positions gagnantes
-                        for coup in coups:
-                            pos = str(coup)  # Convertir la position en string pour la clé
-                            patterns[partie['gagnant']]['frequence'][pos] = \
-                                patterns[partie['gagnant']]['frequence'].get(pos, 0) + 1
-                                
-                    except Exception as e:
-                        print(f"Erreur lors de l'analyse des coups: {e}, valeur: {partie.get('coups', 'Non défini')}")
-        
+                        patterns.add_game(partie['gagnant'], coups)
+                    except (TypeError, ValueError) as e:
+                        print(f"Erreur lors de l'analyse des coups: {e}, valeur: {coups}")
         return patterns
 
 class CSVStatsManager:
-    def __init__(self, filename="stats.csv"):
+    """
+    Statistiques enregistrées dans un fichier CSV, une ligne par partie
+
+    En mode ajout seul (STATS_APPEND_ONLY), chaque partie est ajoutée à la fin
+    du fichier au lieu de le réécrire en entier : le coût d'une sauvegarde ne
+    dépend pas de la taille de l'historique. Quand le fichier atteint
+    STATS_SEGMENT_ROWS parties, il est archivé comme segment (stats.csv.1,
+    stats.csv.2...) puis compressé en gzip en arrière-plan ; le chargement lit
+    les segments puis le fichier courant.
+    """
+
+    def __init__(self, filename="stats.csv", ajout_seul=STATS_APPEND_ONLY, fsync=STATS_FSYNC,
+                 lignes_par_segment=STATS_SEGMENT_ROWS):
         self.filename = filename
+        self.ajout_seul = ajout_seul
+        # Quand forcer l'écriture sur disque : 'always', 'interval' ou 'never'
+        self.fsync = fsync
+        self.lignes_par_segment = lignes_par_segment
+        self.dernier_fsync = time.monotonic()
+        self.lignes_fichier = 0  # Parties du fichier courant, hors segments
+        self.compaction = None  # Thread de compression du dernier segment archivé
+        self.lignes_ignorees = 0  # Lignes invalides des fichiers, laissées en place
         self.stats = {
             'parties_jouées': 0,
             'victoires_joueur': 0,
@@ -151,45 +169,207 @@ class CSVStatsManager:
         self.charger_stats()
         
     def charger_stats(self):
-        """Charge les statistiques depuis le fichier CSV"""
+        """Charge les statistiques depuis le fichier CSV et ses segments"""
+        segments = self.segments()
         if not os.path.exists(self.filename):
             # Créer le fichier CSV avec les en-têtes
-            with open(self.filename, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['date', 'gagnant', 'duree', 'coups'])
-            return
+            self._ecrire_en_tete()
+            if not segments:
+                return
             
+        historique = []
+        for _, chemin in segments:
+            try:
+                historique.extend(self._lire_fichier(chemin)[1])
+            except (OSError, csv.Error, UnicodeDecodeError, EOFError) as e:
+                # Le segment reste sur le disque, il n'est simplement pas chargé
+                print(f"Segment illisible {chemin}: {e}")
+        ignorees = self.lignes_ignorees
         try:
-            # Lire le fichier CSV avec pandas
-            df = pd.read_csv(self.filename)
-            
-            # Mettre à jour les statistiques générales
-            self.stats['parties_jouées'] = len(df)
-            self.stats['victoires_joueur'] = len(df[df['gagnant'] == 'X'])
-            self.stats['victoires_ia'] = len(df[df['gagnant'] == 'O'])
-            self.stats['matchs_nuls'] = len(df[df['gagnant'] == 'N'])
-            
-            # Convertir l'historique en format liste
-            self.stats['historique'] = df.to_dict('records')
-            
-        except Exception as e:
+            self._reparer_fin_fichier()
+            colonnes, courant = self._lire_fichier(self.filename)
+        except (OSError, csv.Error, UnicodeDecodeError) as e:
             print(f"Erreur lors du chargement des statistiques: {e}")
-            # Recréer le fichier en cas d'erreur
-            with open(self.filename, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['date', 'gagnant', 'duree', 'coups'])
+            # Ne jamais écraser un fichier illisible : le garder de côté et en commencer un nouveau
+            print(f"Fichier conservé sous {self._mettre_de_cote()}")
+            self._ecrire_en_tete()
+            colonnes, courant = EN_TETE, []
+        if colonnes != EN_TETE:
+            # Fichier écrit sans la colonne des coups : le normaliser pour les ajouts,
+            # l'original est conservé
+            self._mettre_de_cote()
+            self._ecrire_en_tete()
+            self._ajouter_lignes(courant)
+        else:
+            # Les lignes invalides restent dans le fichier courant
+            self.lignes_fichier = len(courant) + self.lignes_ignorees - ignorees
+        historique.extend(courant)
+        if self.lignes_ignorees:
+            print(f"{self.lignes_ignorees} ligne(s) invalide(s) ignorée(s) dans les statistiques")
+        
+        # Mettre à jour les statistiques générales
+        gagnants = [partie['gagnant'] for partie in historique]
+        self.stats['parties_jouées'] = len(historique)
+        self.stats['victoires_joueur'] = gagnants.count('X')
+        self.stats['victoires_ia'] = gagnants.count('O')
+        self.stats['matchs_nuls'] = gagnants.count('N')
+        self.stats['historique'] = historique
+
+    def _mettre_de_cote(self):
+        """Renomme le fichier courant en copie de sauvegarde datée, renvoie son chemin"""
+        chemin = f"{self.filename}.{datetime.now().strftime('%Y%m%d-%H%M%S')}.bak"
+        os.replace(self.filename, chemin)
+        return chemin
+
+    def _lire_fichier(self, chemin):
+        """
+        Lit un fichier de statistiques, compressé ou non, avec le module csv :
+        pandas n'est alors pas importé au lancement du jeu.
+        Les lignes invalides sont ignorées et comptées dans lignes_ignorees.
+        Renvoie (colonnes, parties)
+        """
+        ouvrir = gzip.open if chemin.endswith('.gz') else open
+        with ouvrir(chemin, 'rt', newline='') as f:
+            reader = csv.reader(f)
+            colonnes = next(reader, [])
+            index = [colonnes.index(nom) if nom in colonnes else None for nom in EN_TETE]
+            parties = []
+            for ligne in reader:
+                if not ligne:
+                    continue
+                date, gagnant, duree, coups = [ligne[i] if i is not None and i < len(ligne) else '' for i in index]
+                try:
+                    duree = float(duree) if duree else float('nan')
+                except ValueError:
+                    duree = None
+                if duree is None or gagnant not in (PLAYER_X, PLAYER_O, 'N'):
+                    self.lignes_ignorees += 1
+                    continue
+                parties.append({
+                    'date': date,
+                    'gagnant': gagnant,
+                    'duree': duree,
+                    'coups': coups or None
+                })
+        return colonnes, parties
+
+    def segments(self):
+        """Segments archivés de l'historique, [(numéro, chemin)] du plus ancien au plus récent"""
+        dossier = os.path.dirname(os.path.abspath(self.filename))
+        base = os.path.basename(self.filename) + '.'
+        trouves = {}
+        for nom in os.listdir(dossier):
+            numero, _, extension = nom[len(base):].partition('.')
+            if nom.startswith(base) and numero.isdigit() and extension in ('', 'gz'):
+                # Une compression interrompue laisse les deux versions, la .gz est alors complète
+                if extension == 'gz' or int(numero) not in trouves:
+                    trouves[int(numero)] = os.path.join(dossier, nom)
+        return sorted(trouves.items())
+
+    def _ecrire_en_tete(self):
+        with open(self.filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(EN_TETE)
+        self.lignes_fichier = 0
+
+    def _reparer_fin_fichier(self):
+        """Supprime la dernière ligne si son écriture a été interrompue"""
+        with open(self.filename, 'rb+') as f:
+            taille = f.seek(0, os.SEEK_END)
+            debut = max(0, taille - 64 * 1024)
+            f.seek(debut)
+            fin = f.read()
+            if not fin or fin.endswith(b'\n'):
+                return
+            coupure = fin.rfind(b'\n') + 1
+            if coupure == 0 and debut > 0:
+                return
+            try:
+                ligne = next(csv.reader([fin[coupure:].decode()], strict=True))
+            except (csv.Error, UnicodeDecodeError, StopIteration):
+                ligne = None
+            if ligne is not None and len(ligne) == len(EN_TETE):
+                # Ligne complète, seul le saut de ligne manque
+                f.write(b'\n')
+            else:
+                f.truncate(debut + coupure)
                 
     def sauvegarder_stats(self):
-        """Sauvegarde les statistiques dans le fichier CSV"""
+        """Réécrit tout l'historique dans le fichier CSV, sans segments"""
+        self.attendre_compaction()
         try:
+            # pandas n'est importé qu'ici, lors d'une réinitialisation
+            import pandas as pd
             # Convertir l'historique en DataFrame
-            df = pd.DataFrame(self.stats['historique'])
+            df = pd.DataFrame(self.stats['historique'], columns=EN_TETE)
             
-            # Sauvegarder dans le fichier CSV
-            df.to_csv(self.filename, index=False)
+            # Sauvegarder dans un fichier temporaire, puis le mettre à la place du fichier
+            temporaire = self.filename + '.tmp'
+            df.to_csv(temporaire, index=False)
+            os.replace(temporaire, self.filename)
+            self.lignes_fichier = len(df)
+            for _, chemin in self.segments():
+                os.remove(chemin)
             
         except Exception as e:
             print(f"Erreur lors de la sauvegarde des statistiques: {e}")
+
+    def _ajouter_lignes(self, parties):
+        """Ajoute les parties à la fin du fichier courant"""
+        try:
+            with open(self.filename, 'a', newline='') as f:
+                writer = csv.writer(f)
+                for partie in parties:
+                    writer.writerow([partie['date'], partie['gagnant'], partie['duree'], partie.get('coups', '')])
+                f.flush()
+                maintenant = time.monotonic()
+                if self.fsync == 'always' or (
+                        self.fsync == 'interval' and maintenant - self.dernier_fsync >= STATS_FSYNC_INTERVAL):
+                    os.fsync(f.fileno())
+                    self.dernier_fsync = maintenant
+            self.lignes_fichier += len(parties)
+            if self.lignes_par_segment and self.lignes_fichier >= self.lignes_par_segment:
+                self.archiver_segment()
+        except Exception as e:
+            print(f"Erreur lors de la sauvegarde des statistiques: {e}")
+
+    def archiver_segment(self):
+        """
+        Archive le fichier courant comme segment suivant de l'historique et
+        repart d'un fichier vide, le segment est compressé en arrière-plan
+        """
+        self.attendre_compaction()
+        segments = self.segments()
+        numero = segments[-1][0] + 1 if segments else 1
+        chemin = f"{self.filename}.{numero}"
+        os.replace(self.filename, chemin)
+        self._ecrire_en_tete()
+        self.compaction = threading.Thread(target=self._compresser, args=(chemin,))
+        self.compaction.start()
+
+    @staticmethod
+    def _compresser(chemin):
+        temporaire = chemin + '.gz.tmp'
+        with open(chemin, 'rb') as source, open(temporaire, 'wb') as destination:
+            with gzip.GzipFile(fileobj=destination, mode='wb') as archive:
+                shutil.copyfileobj(source, archive)
+            destination.flush()
+            os.fsync(destination.fileno())
+        os.replace(temporaire, chemin + '.gz')
+        os.remove(chemin)
+
+    def attendre_compaction(self):
+        """Attend la fin de la compression du dernier segment archivé"""
+        if self.compaction is not None:
+            self.compaction.join()
+            self.compaction = None
+
+    def fermer(self):
+        """Force les dernières parties sur disque et attend la compression en cours"""
+        self.attendre_compaction()
+        if self.fsync != 'never' and os.path.exists(self.filename):
+            with open(self.filename, 'a') as f:
+                os.fsync(f.fileno())
             
     def ajouter_partie(self, gagnant, duree, coups=None):
         """Ajoute une nouvelle partie aux statistiques"""
@@ -213,7 +393,41 @@ class CSVStatsManager:
         else:
             self.stats['matchs_nuls'] += 1
             
-        self.sauvegarder_stats()
+        if self.ajout_seul:
+            self._ajouter_lignes([nouvelle_partie])
+        else:
+            self.sauvegarder_stats()
+        return self.get_statistiques()
+        
+    def ajouter_parties(self, parties):
+        """
+        Ajoute plusieurs parties avec une seule écriture du fichier
+        parties : liste de dictionnaires avec les clés 'gagnant', 'duree' et 'coups'
+        """
+        date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        nouvelles_parties = []
+        for partie in parties:
+            nouvelle_partie = {
+                'date': date,
+                'gagnant': partie['gagnant'],
+                'duree': partie['duree']
+            }
+            if partie.get('coups'):
+                nouvelle_partie['coups'] = str(partie['coups'])
+            nouvelles_parties.append(nouvelle_partie)
+            self.stats['historique'].append(nouvelle_partie)
+            self.stats['parties_jouées'] += 1
+            if partie['gagnant'] == 'X':
+                self.stats['victoires_joueur'] += 1
+            elif partie['gagnant'] == 'O':
+                self.stats['victoires_ia'] += 1
+            else:
+                self.stats['matchs_nuls'] += 1
+
+        if self.ajout_seul:
+            self._ajouter_lignes(nouvelles_parties)
+        else:
+            self.sauvegarder_stats()
         return self.get_statistiques()
         
     def get_statistiques(self):
@@ -243,51 +457,305 @@ class CSVStatsManager:
         }
         self.sauvegarder_stats()
         
-    def analyser_historique_victoires(self):
-        """Analyse l'historique des parties pour identifier les patterns gagnants"""
-        historique = self.stats['historique']
-        patterns = {
-            'X': {'coups': [], 'frequence': {}},  # Patterns du joueur
-            'O': {'coups': [], 'frequence': {}}   # Patterns de l'IA
-        }
-        
-        # Analyser chaque partie gagnante
-        for partie in historique:
+    def analyser_historique_victoires(self, rows=ROWS, columns=COLUMNS):
+        """
+        Analyse l'historique des parties pour identifier les patterns gagnants
+        Renvoie un LearnedPatterns : nombre de coups par case dans les parties gagnées
+        """
+        patterns = LearnedPatterns(rows, columns)
+        for partie in self.stats['historique']:
             if partie['gagnant'] in ['X', 'O']:
-                # Ajouter l'analyse des coups de cette partie
-                if 'coups' in partie:  # Si les coups ont été enregistrés
+                coups = lire_coups(partie.get('coups'))
+                if coups:
                     try:
-                        # Convertir de string à liste si nécessaire
-                        coups = partie['coups']
-                        
-                        # Vérifier le type de coups
-                        if isinstance(coups, (float, int)) or coups == 'nan':
-                            # Skip this entry - it's a number or NaN, not a list
-                            continue
-                            
-                        if isinstance(coups, str):
-                            # Le format sera quelque chose comme "[(0, 1), (1, 2), ...]"
-                            try:
-                                import ast
-                                coups = ast.literal_eval(coups)
-                                # Vérifier que c'est bien une liste
-                                if not isinstance(coups, list):
-                                    continue
-                            except (SyntaxError, ValueError):
-                                # Si la conversion échoue, ignorer cette entrée
-                                print(f"Format de coups invalide: {coups}")
-                                continue
-                        
-                        # Maintenant que nous avons une liste valide, traiter les coups
-                        patterns[partie['gagnant']]['coups'].extend(coups)
-                        
-                        # Compter la fréquence des positions gagnantes
-                        for coup in coups:
-                            pos = str(coup)  # Convertir la position en string pour la clé
-                            patterns[partie['gagnant']]['frequence'][pos] = \
-                                patterns[partie['gagnant']]['frequence'].get(pos, 0) + 1
-                                
-                    except Exception as e:
-                        print(f"Erreur lors de l'analyse des coups: {e}, valeur: {partie.get('coups', 'Non défini')}")
-        
-        return patterns
\ No newline at end of file
+                        patterns.add_game(partie['gagnant'], coups)
+                    except (TypeError, ValueError) as e:
+                        print(f"Erreur lors de l'analyse des coups: {e}, valeur: {coups}")
+        return patterns
+
+
+class BinaryStatsManager:
+    """
+    Statistiques enregistrées au format binaire de records.py
+
+    Chaque partie est ajoutée en fin de fichier en une trentaine d'octets :
+    les colonnes jouées, deux par octet, et des champs de taille fixe pour
+    la date, le gagnant et la durée. Un fichier ne contient que des parties
+    d'une même géométrie de plateau, celle de son en-tête.
+    """
+
+    def __init__(self, filename="stats.c4r", rows=ROWS, columns=COLUMNS, fsync=STATS_FSYNC):
+        self.filename = filename
+        # Quand forcer l'écriture sur disque : 'always', 'interval' ou 'never'
+        self.fsync = fsync
+        self.dernier_fsync = time.monotonic()
+        self.parties = []  # (timestamp, gagnant, durée, colonnes jouées)
+        self.resultats = {'X': 0, 'O': 0, 'N': 0}
+        self.charger_stats(rows, columns)
+
+    def charger_stats(self, rows=ROWS, columns=COLUMNS):
+        """Charge les parties du fichier, en supprimant une dernière partie incomplète"""
+        taille = None
+        if os.path.exists(self.filename) and os.path.getsize(self.filename) > 0:
+            try:
+                rows, columns, self.parties, taille = read_records(self.filename)
+            except ValueError as e:
+                print(f"Erreur lors du chargement des statistiques: {e}")
+                os.replace(self.filename, self.filename + '.invalide')
+        self.writer = RecordWriter(self.filename, rows, columns)
+        if taille is not None and taille < os.path.getsize(self.filename):
+            self.writer.truncate(taille)
+        self.rows, self.columns = self.writer.rows, self.writer.columns
+        self.resultats = {'X': 0, 'O': 0, 'N': 0}
+        for _, gagnant, _, _ in self.parties:
+            self.resultats[gagnant] += 1
+
+    def _ecrire(self, parties):
+        for timestamp, gagnant, duree, colonnes in parties:
+            self.writer.append(gagnant, duree, colonnes, timestamp)
+        maintenant = time.monotonic()
+        fsync = self.fsync == 'always' or (
+            self.fsync == 'interval' and maintenant - self.dernier_fsync >= STATS_FSYNC_INTERVAL)
+        self.writer.flush(fsync)
+        if fsync:
+            self.dernier_fsync = maintenant
+
+    def ajouter_partie(self, gagnant, duree, coups=None):
+        """Ajoute une nouvelle partie aux statistiques"""
+        return self.ajouter_parties([{'gagnant': gagnant, 'duree': duree, 'coups': coups}])
+
+    def ajouter_parties(self, parties):
+        """
+        Ajoute plusieurs parties avec une seule écriture du fichier
+        parties : liste de dictionnaires avec les clés 'gagnant', 'duree' et 'coups'
+        """
+        timestamp = int(time.time())
+        nouvelles_parties = []
+        for partie in parties:
+            colonnes = bytes(colonne for _, colonne in partie.get('coups') or [])
+            nouvelles_parties.append((timestamp, partie['gagnant'], partie['duree'], colonnes))
+            self.resultats[partie['gagnant']] += 1
+        self._ecrire(nouvelles_parties)
+        self.parties.extend(nouvelles_parties)
+        return self.get_statistiques()
+
+    def get_statistiques(self):
+        """Retourne les statistiques générales"""
+        total = len(self.parties)
+        return {
+            'parties_jouées': total,
+            'victoires_joueur': self.resultats['X'],
+            'victoires_ia': self.resultats['O'],
+            'matchs_nuls': self.resultats['N'],
+            'pourcentage_victoires_joueur': round(self.resultats['X'] / total * 100 if total > 0 else 0, 1),
+            'pourcentage_victoires_ia': round(self.resultats['O'] / total * 100 if total > 0 else 0, 1),
+            'pourcentage_matchs_nuls': round(self.resultats['N'] / total * 100 if total > 0 else 0, 1)
+        }
+
+    def get_historique(self, n=10):
+        """Retourne les n dernières parties"""
+        parties = self.parties[-n:] if n > 0 else self.parties
+        return [{
+            'date': datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S"),
+            'gagnant': gagnant,
+            'duree': duree,
+            'coups': replay(colonnes, self.rows)
+        } for timestamp, gagnant, duree, colonnes in parties]
+
+    def reinitialiser_stats(self):
+        """Réinitialise toutes les statistiques"""
+        self.parties = []
+        self.resultats = {'X': 0, 'O': 0, 'N': 0}
+        self.writer.truncate(HEADER.size)
+
+    def fermer(self):
+        """Force les dernières parties sur disque et ferme le fichier"""
+        self.writer.flush(self.fsync != 'never')
+        self.writer.close()
+
+    def analyser_historique_victoires(self, rows=ROWS, columns=COLUMNS):
+        """
+        Analyse l'historique des parties pour identifier les patterns gagnants
+        Renvoie un LearnedPatterns : nombre de coups par case dans les parties gagnées
+        """
+        patterns = LearnedPatterns(rows, columns)
+        for _, gagnant, _, colonnes in self.parties:
+            if gagnant in ['X', 'O'] and colonnes:
+                patterns.add_game(gagnant, replay(colonnes, self.rows))
+        return patterns
+
+
+class SQLiteStatsManager:
+    """
+    Statistiques enregistrées dans une base SQLite (module sqlite3)
+
+    La base est en mode WAL, indexée sur la date et le gagnant. Les coups
+    d'une partie sont stockés comme la suite des colonnes jouées, et la
+    table cases compte les coups de chaque case dans les parties gagnées :
+    elle est mise à jour à chaque ajout, les patterns appris sont donc une
+    simple lecture de cette table. Les nombres de victoires sont comptés par
+    SQLite à l'ouverture. Les ajouts sont validés (commit) par lots selon
+    STATS_FSYNC, pour les rafales de parties de l'IA.
+    """
+
+    def __init__(self, filename="stats.db", rows=ROWS, columns=COLUMNS, fsync=STATS_FSYNC,
+                 taille_lot=STATS_COMMIT_BATCH):
+        self.filename = filename
+        # Quand valider les ajouts : 'always' (chaque partie), 'interval' (toutes les
+        # STATS_FSYNC_INTERVAL secondes) ou 'never' (par lots de taille_lot parties)
+        self.fsync = fsync
+        self.taille_lot = taille_lot
+        self.en_attente = 0  # Parties ajoutées depuis le dernier commit
+        self.dernier_commit = time.monotonic()
+        self.connexion = sqlite3.connect(filename)
+        self.connexion.execute("PRAGMA journal_mode=WAL")
+        self.connexion.execute("PRAGMA synchronous=" + ("FULL" if fsync == 'always' else "NORMAL"))
+        self.connexion.executescript("""
+            CREATE TABLE IF NOT EXISTS parties (
+                id INTEGER PRIMARY KEY,
+                date TEXT NOT NULL,
+                gagnant TEXT NOT NULL,
+                duree REAL NOT NULL,
+                coups BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS parties_date ON parties (date);
+            CREATE INDEX IF NOT EXISTS parties_gagnant ON parties (gagnant);
+            CREATE TABLE IF NOT EXISTS cases (
+                gagnant TEXT NOT NULL,
+                ligne INTEGER NOT NULL,
+                colonne INTEGER NOT NULL,
+                nombre INTEGER NOT NULL,
+                PRIMARY KEY (gagnant, ligne, colonne)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS geometrie (lignes INTEGER NOT NULL, colonnes INTEGER NOT NULL);
+        """)
+        geometrie = self.connexion.execute("SELECT lignes, colonnes FROM geometrie").fetchone()
+        if geometrie is None:
+            self.connexion.execute("INSERT INTO geometrie VALUES (?, ?)", (rows, columns))
+            self.connexion.commit()
+            geometrie = (rows, columns)
+        # Les lignes des coups se déduisent des colonnes jouées sur ce plateau
+        self.rows, self.columns = geometrie
+        # Nombre de parties de chaque résultat, compté une fois par SQLite
+        # (index sur le gagnant) puis tenu à jour à chaque ajout
+        self.resultats = {'X': 0, 'O': 0, 'N': 0}
+        self.resultats.update(self.connexion.execute(
+            "SELECT gagnant, COUNT(*) FROM parties GROUP BY gagnant").fetchall())
+
+    def ajouter_partie(self, gagnant, duree, coups=None):
+        """Ajoute une nouvelle partie aux statistiques"""
+        return self.ajouter_parties([{'gagnant': gagnant, 'duree': duree, 'coups': coups}])
+
+    def ajouter_parties(self, parties):
+        """
+        Ajoute plusieurs parties dans une seule transaction
+        parties : liste de dictionnaires avec les clés 'gagnant', 'duree' et 'coups'
+        """
+        date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        lignes = []
+        cases = {}
+        for partie in parties:
+            coups = partie.get('coups') or []
+            lignes.append((date, partie['gagnant'], partie['duree'], bytes(colonne for _, colonne in coups)))
+            self.resultats[partie['gagnant']] += 1
+            if partie['gagnant'] in ['X', 'O']:
+                for ligne, colonne in coups:
+                    cle = (partie['gagnant'], ligne, colonne)
+                    cases[cle] = cases.get(cle, 0) + 1
+        self.connexion.executemany(
+            "INSERT INTO parties (date, gagnant, duree, coups) VALUES (?, ?, ?, ?)", lignes)
+        self.connexion.executemany(
+            "INSERT INTO cases VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (gagnant, ligne, colonne) DO UPDATE SET nombre = nombre + excluded.nombre",
+            [cle + (nombre,) for cle, nombre in cases.items()])
+        self.en_attente += len(lignes)
+        maintenant = time.monotonic()
+        if (self.fsync == 'always' or self.en_attente >= self.taille_lot or (
+                self.fsync == 'interval' and maintenant - self.dernier_commit >= STATS_FSYNC_INTERVAL)):
+            self.valider()
+        return self.get_statistiques()
+
+    def valider(self):
+        """Valide les parties en attente"""
+        self.connexion.commit()
+        self.en_attente = 0
+        self.dernier_commit = time.monotonic()
+
+    def get_statistiques(self):
+        """Retourne les statistiques générales"""
+        joueur, ia, nuls = self.resultats['X'], self.resultats['O'], self.resultats['N']
+        total = joueur + ia + nuls
+        return {
+            'parties_jouées': total,
+            'victoires_joueur': joueur,
+            'victoires_ia': ia,
+            'matchs_nuls': nuls,
+            'pourcentage_victoires_joueur': round(joueur / total * 100 if total > 0 else 0, 1),
+            'pourcentage_victoires_ia': round(ia / total * 100 if total > 0 else 0, 1),
+            'pourcentage_matchs_nuls': round(nuls / total * 100 if total > 0 else 0, 1)
+        }
+
+    def get_historique(self, n=10):
+        """Retourne les n dernières parties"""
+        if n > 0:
+            lignes = self.connexion.execute(
+                "SELECT date, gagnant, duree, coups FROM parties ORDER BY id DESC LIMIT ?", (n,)).fetchall()
+            lignes.reverse()
+        else:
+            lignes = self.connexion.execute("SELECT date, gagnant, duree, coups FROM parties ORDER BY id").fetchall()
+        return [{'date': date, 'gagnant': gagnant, 'duree': duree, 'coups': replay(coups, self.rows)}
+                for date, gagnant, duree, coups in lignes]
+
+    def get_parties_entre(self, debut, fin):
+        """Nombre de parties de chaque résultat entre deux dates 'AAAA-MM-JJ HH:MM:SS' (index sur la date)"""
+        lignes = self.connexion.execute(
+            "SELECT gagnant, COUNT(*) FROM parties WHERE date >= ? AND date < ? GROUP BY gagnant", (debut, fin))
+        return dict(lignes.fetchall())
+
+    def reinitialiser_stats(self):
+        """Réinitialise toutes les statistiques"""
+        self.connexion.execute("DELETE FROM parties")
+        self.connexion.execute("DELETE FROM cases")
+        self.valider()
+        self.resultats = {'X': 0, 'O': 0, 'N': 0}
+
+    def fermer(self):
+        """Valide les parties en attente et ferme la base"""
+        self.valider()
+        self.connexion.close()
+
+    def analyser_historique_victoires(self, rows=ROWS, columns=COLUMNS):
+        """
+        Analyse l'historique des parties pour identifier les patterns gagnants
+        Renvoie un LearnedPatterns, lu directement dans la table des cases,
+        sauf avec PATTERN_HALF_LIFE : les parties gagnées sont alors rejouées
+        dans l'ordre pour appliquer la même décroissance que les autres formats
+        """
+        patterns = LearnedPatterns(rows, columns)
+        if patterns.half_life:
+            for gagnant, coups in self.connexion.execute(
+                    "SELECT gagnant, coups FROM parties WHERE gagnant IN ('X', 'O') ORDER BY id"):
+                if coups:
+                    patterns.add_game(gagnant, replay(coups, self.rows))
+            return patterns
+        for gagnant, ligne, colonne, nombre in self.connexion.execute("SELECT * FROM cases"):
+            if 0 <= ligne < rows and 0 <= colonne < columns:
+                patterns.counts[gagnant][ligne, colonne] += nombre
+            patterns.moves[gagnant] += nombre
+        patterns.version += 1
+        return patterns
+
+
+def creer_stats_manager(rows=ROWS, columns=COLUMNS, connect=CONNECT, backend=STATS_BACKEND):
+    """Crée le gestionnaire de statistiques du format choisi (STATS_BACKEND)"""
+    # Un fichier ou une base par géométrie de plateau et nombre de pions à aligner :
+    # stats.csv pour le puissance 4 en 6x7, stats_8x9c4.csv, stats_6x7c5.csv...
+    if (rows, columns, connect) == (ROWS, COLUMNS, CONNECT):
+        nom = "stats"
+    else:
+        nom = f"stats_{rows}x{columns}c{connect}"
+    if backend == 'binary':
+        return BinaryStatsManager(nom + ".c4r", rows, columns)
+    if backend == 'sqlite':
+        return SQLiteStatsManager(nom + ".db", rows, columns)
+    return CSVStatsManager(nom + ".csv")
@@ -1,5 +1,4 @@
 import os
-import pandas as pd
 import csv
 
 class CSVStatsManager:
@@ -24,6 +23,7 @@ class CSVStatsManager:
         try:
             # Check if the history file exists
             if os.path.exists(self.file_path):
+                import pandas as pd
                 data = pd.read_csv(self.file_path)
                 
                 if not data.empty:
@@ -0,0 +1,27 @@
+import pytest
+from constants import *
+from game import Connect4
+
+
+@pytest.fixture
+def game(tmp_path, monkeypatch):
+    # The stats files of the game are created in a temporary directory
+    monkeypatch.chdir(tmp_path)
+    game = Connect4()
+    for column in [3, 3, 2, 4]:
+        game.place_token(column)
+        game.change_player()
+    return game
+
+
+@pytest.mark.parametrize('level', [1, 2])
+def test_ai_moves_chosen_on_a_snapshot_leave_the_game_alone(game, level):
+    game.ai_level = level
+    board = [list(row) for row in game.board]
+    snapshot = game.snapshot()
+    # A move is tried on the snapshot while it is being chosen
+    snapshot.position.make(0, game.current_player)
+    assert snapshot.choose_best_move() is not None
+    assert game.board == board
+    assert game.bitboard.move_count == 4
+    assert snapshot.position.unmake()[1] == 0
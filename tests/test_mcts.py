@@ -0,0 +1,28 @@
+from bitboard import BitBoard
+from constants import *
+from mcts import MCTS
+
+
+def play_columns(columns):
+    board = BitBoard()
+    for index, column in enumerate(columns):
+        board.play(int(column), PLAYER_X if index % 2 == 0 else PLAYER_O)
+    return board
+
+
+def test_mcts_takes_an_immediate_win():
+    board = play_columns('001122')
+    assert MCTS(time_limit=None, iterations=50, seed=1).search(board, PLAYER_X) == 3
+
+
+def test_mcts_blocks_an_immediate_win():
+    board = play_columns('00112')
+    assert MCTS(time_limit=None, iterations=50, seed=1).search(board, PLAYER_O) == 3
+
+
+def test_mcts_plays_a_legal_column_and_counts_its_playouts():
+    board = play_columns('3333332')
+    mcts = MCTS(time_limit=None, iterations=100, seed=1)
+    column = mcts.search(board, PLAYER_O)
+    assert column != 3 and board.can_play(column)
+    assert mcts.last_stats['playouts'] > 0
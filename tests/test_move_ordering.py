@@ -0,0 +1,37 @@
+from bitboard import BitBoard
+from constants import *
+from move_ordering import MoveOrderer
+
+
+def play_columns(columns):
+    board = BitBoard()
+    for index, column in enumerate(columns):
+        board.play(int(column), PLAYER_X if index % 2 == 0 else PLAYER_O)
+    return board
+
+
+def test_winning_move_comes_first():
+    board = play_columns('001122')
+    assert MoveOrderer().order(board, PLAYER_X, 0)[0] == 3
+
+
+def test_blocking_move_comes_first():
+    board = play_columns('00112')
+    assert MoveOrderer().order(board, PLAYER_O, 0)[0] == 3
+
+
+def test_table_move_comes_first_and_every_column_is_ordered():
+    board = play_columns('3')
+    moves = MoveOrderer().order(board, PLAYER_O, 0, table_move=6)
+    assert moves[0] == 6
+    assert sorted(moves) == list(range(COLUMNS))
+
+
+def test_move_under_an_opponent_win_comes_last():
+    board = BitBoard()
+    # X has three tokens on the second row, columns 1 to 3, and wins above column 4
+    for column, player in [(0, PLAYER_X), (1, PLAYER_O), (2, PLAYER_X), (3, PLAYER_O),
+                           (0, PLAYER_O), (1, PLAYER_X), (2, PLAYER_X), (3, PLAYER_X)]:
+        board.play(column, player)
+    assert not board.winning_cells(PLAYER_X) & board.playable_cells()
+    assert MoveOrderer().order(board, PLAYER_O, 0)[-1] == 4
@@ -0,0 +1,39 @@
+import threading
+import pytest
+from bitboard import BitBoard
+from constants import *
+from parallel_search import RootParallelSearch
+
+
+def play_columns(columns):
+    board = BitBoard()
+    for index, column in enumerate(columns):
+        board.play(int(column), PLAYER_X if index % 2 == 0 else PLAYER_O)
+    return board
+
+
+@pytest.fixture(scope='module')
+def search():
+    search = RootParallelSearch(workers=2, time_limit=None, max_depth=3)
+    yield search
+    search.shutdown()
+
+
+def test_parallel_search_takes_an_immediate_win(search):
+    assert search.search(play_columns('001122'), PLAYER_X) == 3
+
+
+def test_parallel_search_blocks_an_immediate_win(search):
+    assert search.search(play_columns('00112'), PLAYER_O) == 3
+    assert set(search.move_scores) == set(range(COLUMNS))
+
+
+def test_cancelled_parallel_search_returns_a_legal_column(search):
+    search.cancel = threading.Event()
+    search.cancel.set()
+    try:
+        board = play_columns('3333332')
+        column = search.search(board, PLAYER_O)
+        assert board.can_play(column)
+    finally:
+        search.cancel = None
@@ -0,0 +1,22 @@
+from bitboard import BitBoard
+from constants import *
+from ponder import Ponderer
+from search import NegamaxSearch
+from transposition import TranspositionTable
+
+
+def test_pondering_keeps_replying_after_many_moves():
+    table = TranspositionTable(1)
+    ponderer = Ponderer(table, cpu_share=1.0, max_positions=8)
+    search = NegamaxSearch(time_limit=None, node_limit=200, table=table)
+    board = BitBoard()
+    # Columns of a 14-move game, the human playing X
+    moves = [3, 3, 2, 4, 4, 2, 5, 1, 1, 0, 6, 6, 0, 5]
+    for turn in range(0, len(moves), 2):
+        ponderer.start(board, PLAYER_X, search)
+        ponderer.thread.join()
+        ponderer.stop()
+        board.play(moves[turn], PLAYER_X)
+        assert ponderer.lookup(board) is not None, f"no pondered reply after {turn + 1} moves"
+        board.play(moves[turn + 1], PLAYER_O)
+    assert ponderer.hits == len(moves) // 2
@@ -0,0 +1,40 @@
+import os
+import shutil
+import numpy as np
+from constants import *
+from patterns import LearnedPatterns
+from records import convert_csv, replay
+from stats import BinaryStatsManager, CSVStatsManager, lire_coups
+
+STATS_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'stats.csv')
+
+
+def test_convert_real_stats_learns_the_same_patterns(tmp_path):
+    copy = tmp_path / 'stats.csv'
+    shutil.copy(STATS_CSV, copy)
+    output = tmp_path / 'stats.c4r'
+    count, skipped = convert_csv(str(copy), str(output))
+
+    csv_manager = CSVStatsManager(str(copy))
+    historique = csv_manager.get_historique(0)
+    csv_manager.fermer()
+    assert count + len(skipped) == len(historique)
+
+    # The games whose moves come back from their columns, the others are skipped
+    expected = LearnedPatterns()
+    kept = 0
+    for partie in historique:
+        coups = lire_coups(partie['coups']) or []
+        if replay([column for _, column in coups], ROWS) == [tuple(move) for move in coups]:
+            kept += 1
+            if coups:
+                expected.add_game(partie['gagnant'], coups)
+    assert kept == count
+
+    binary = BinaryStatsManager(str(output))
+    learned = binary.analyser_historique_victoires()
+    assert binary.get_statistiques()['parties_jouées'] == count
+    binary.fermer()
+    for player in (PLAYER_X, PLAYER_O):
+        assert np.array_equal(learned.counts[player], expected.counts[player])
+        assert learned.moves[player] == expected.moves[player]
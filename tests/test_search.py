@@ -0,0 +1,45 @@
+from bitboard import BitBoard
+from constants import *
+from search import NegamaxSearch
+from transposition import TranspositionTable
+
+def play_columns(columns, board=None):
+    """Plays the columns of the string from the empty board, X first"""
+    board = board or BitBoard()
+    for index, column in enumerate(columns):
+        board.play(int(column), PLAYER_X if index % 2 == 0 else PLAYER_O)
+    return board
+
+
+# Columns 0 to 6 of a 6x9 board filled without any alignment, bottom first
+FULL_COLUMNS = ['XXOXOX', 'OXXOOX', 'OOOXXO', 'XXXOOX', 'OOOXOO', 'XOOXXX', 'XOXOXO']
+
+
+def test_search_plays_the_columns_of_a_wide_board():
+    board = BitBoard(6, 9, 4)
+    for column, tokens in enumerate(FULL_COLUMNS):
+        for player in tokens:
+            board.play(column, player)
+    search = NegamaxSearch(time_limit=None, node_limit=2000, table=TranspositionTable(1))
+    assert search.search(board, PLAYER_X) in (7, 8)
+
+
+def test_search_finds_a_win_beyond_column_7():
+    board = BitBoard(6, 10, 4)
+    for column, player in [(5, PLAYER_X), (4, PLAYER_O), (6, PLAYER_X), (4, PLAYER_O), (7, PLAYER_X), (0, PLAYER_O)]:
+        board.play(column, player)
+    search = NegamaxSearch(time_limit=None, node_limit=2000)
+    assert search.search(board, PLAYER_X) == 8
+
+
+def test_search_takes_an_immediate_win():
+    # X has three tokens on the bottom row, columns 0 to 2
+    board = play_columns('001122')
+    search = NegamaxSearch(time_limit=None, max_depth=4, table=TranspositionTable(1))
+    assert search.search(board, PLAYER_X) == 3
+
+
+def test_search_blocks_an_immediate_win():
+    board = play_columns('00112')
+    search = NegamaxSearch(time_limit=None, max_depth=4, table=TranspositionTable(1))
+    assert search.search(board, PLAYER_O) == 3
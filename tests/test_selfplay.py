@@ -0,0 +1,23 @@
+from constants import *
+from records import replay
+from selfplay import run_selfplay
+from stats import CSVStatsManager
+
+
+def test_selfplay_games_are_complete_and_reproducible(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    output = str(tmp_path / 'selfplay.csv')
+    summary = run_selfplay(4, level_x=1, level_o=2, workers=1, output=output)
+    assert sum(summary['results'].values()) == 4
+    for record in summary['records']:
+        columns = [column for _, column in record['coups']]
+        # Real games: the rows follow from the columns played
+        assert replay(columns, ROWS) == record['coups']
+    # The games are written to the output file, the game's own stats file is untouched
+    assert CSVStatsManager(output).get_statistiques()['parties_jouées'] == 4
+    assert CSVStatsManager('stats.csv').get_statistiques()['parties_jouées'] == 0
+
+    # The same seeds give the same games in worker processes
+    parallel = run_selfplay(4, level_x=1, level_o=2, workers=2)
+    assert [record['coups'] for record in parallel['records']] == \
+        [record['coups'] for record in summary['records']]
@@ -0,0 +1,57 @@
+import random
+from bitboard import BitBoard
+from constants import *
+from solver import Solver
+
+
+def brute_force(board, player):
+    """Score of the position with the solver's convention, by full minimax"""
+    cells = board.rows * board.columns
+    if board.winning_cells(player) & board.playable_cells():
+        return (cells + 1 - board.move_count) // 2
+    if board.move_count == cells:
+        return 0
+    opponent = PLAYER_X if player == PLAYER_O else PLAYER_O
+    best = -cells
+    for column in range(board.columns):
+        if board.can_play(column):
+            board.play(column, player)
+            best = max(best, -brute_force(board, opponent))
+            board.undo()
+    return best
+
+
+def near_end_positions(count, empty_cells, seed=3):
+    """
+    Random positions with `empty_cells` cells left, no alignment yet and no
+    immediate win for the player to move
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = BitBoard()
+        player = PLAYER_X
+        while board.move_count < board.rows * board.columns - empty_cells:
+            board.play(rng.choice([col for col in range(board.columns) if board.can_play(col)]), player)
+            if board.last_move_wins():
+                break
+            player = PLAYER_O if player == PLAYER_X else PLAYER_X
+        else:
+            if not board.winning_cells(player) & board.playable_cells():
+                positions.append((board, player))
+    return positions
+
+
+def test_solver_matches_brute_force_near_the_end():
+    solver = Solver(time_limit=None)
+    for board, player in near_end_positions(12, 10):
+        expected = brute_force(board, player)
+        assert solver.solve(board, player) == expected
+        analysis = solver.analyze(board, player)
+        # The chosen move keeps the score
+        opponent = PLAYER_X if player == PLAYER_O else PLAYER_O
+        board.play(analysis['move'], player)
+        score = (board.rows * board.columns + 1 - board.move_count + 1) // 2 if board.last_move_wins() \
+            else -brute_force(board, opponent)
+        board.undo()
+        assert score == expected
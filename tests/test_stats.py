@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+import patterns
+from constants import *
+from stats import BinaryStatsManager, CSVStatsManager, SQLiteStatsManager, creer_stats_manager
+
+# Moves (row, column) of a few games, replayable from their columns
+GAMES = [
+    (PLAYER_X, [(5, 3), (5, 2), (4, 3), (4, 2), (3, 3), (5, 4), (2, 3)]),
+    (PLAYER_O, [(5, 0), (5, 3), (5, 6), (4, 3), (4, 6), (3, 3), (3, 6), (2, 3)]),
+    ('N', [(5, 1), (5, 5)]),
+    (PLAYER_X, [(5, 2), (5, 5), (4, 2), (4, 5), (3, 2), (3, 5), (2, 2)]),
+    (PLAYER_O, [(5, 6), (5, 1), (5, 5), (4, 1), (4, 5), (3, 1), (5, 4), (2, 1)]),
+]
+
+
+@pytest.mark.parametrize('half_life', [None, 2])
+def test_backends_learn_the_same_patterns(tmp_path, monkeypatch, half_life):
+    # PATTERN_HALF_LIFE is the default of LearnedPatterns
+    monkeypatch.setattr(patterns.LearnedPatterns.__init__, '__defaults__', (ROWS, COLUMNS, half_life))
+    managers = [
+        CSVStatsManager(str(tmp_path / 'stats.csv')),
+        BinaryStatsManager(str(tmp_path / 'stats.c4r')),
+        SQLiteStatsManager(str(tmp_path / 'stats.db')),
+    ]
+    learned = []
+    for manager in managers:
+        for winner, moves in GAMES:
+            manager.ajouter_partie(winner, 1.0, moves)
+        learned.append(manager.analyser_historique_victoires())
+        manager.fermer()
+    for player in (PLAYER_X, PLAYER_O):
+        for other in learned[1:]:
+            assert np.array_equal(other.counts[player], learned[0].counts[player])
+
+
+def test_each_geometry_has_its_own_stats_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    names = set()
+    for rows, columns, connect in [(ROWS, COLUMNS, CONNECT), (ROWS, COLUMNS, 5), (8, 9, CONNECT)]:
+        manager = creer_stats_manager(rows, columns, connect, backend='csv')
+        names.add(manager.filename)
+        manager.fermer()
+    assert names == {'stats.csv', 'stats_6x7c5.csv', 'stats_8x9c4.csv'}
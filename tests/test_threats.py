@@ -0,0 +1,37 @@
+import random
+import pytest
+from bitboard import BitBoard
+from constants import *
+from threats import ThreatMap
+
+
+def naive_wins(board, player):
+    """Empty cells completing an alignment of `player`, found by trying each of them"""
+    wins = 0
+    for column in range(board.columns):
+        for height in range(board.rows):
+            bit = 1 << (column * board.stride + height)
+            if not bit & board.mask and board.has_alignment(board.bits[player] | bit):
+                wins |= bit
+    return wins
+
+
+@pytest.mark.parametrize('rows, columns, connect', [(6, 7, 4), (8, 9, 5)])
+def test_threat_map_matches_a_naive_scan(rows, columns, connect):
+    rng = random.Random(5)
+    for _ in range(10):
+        board = BitBoard(rows, columns, connect)
+        threats = ThreatMap(board)
+        player = PLAYER_X
+        while not board.is_full():
+            threats.play(rng.choice([col for col in range(columns) if board.can_play(col)]), player)
+            if board.last_move_wins():
+                break
+            for side in (PLAYER_X, PLAYER_O):
+                assert threats.wins[side] == naive_wins(board, side)
+            player = PLAYER_O if player == PLAYER_X else PLAYER_X
+        # Undoing gives back the maps of the earlier positions
+        while board.move_count > rows:
+            threats.undo()
+        for side in (PLAYER_X, PLAYER_O):
+            assert threats.wins[side] == naive_wins(board, side)
@@ -0,0 +1,44 @@
+from transposition import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
+
+
+def test_stored_results_come_back():
+    table = TranspositionTable(1)
+    table.store(12345, -250, 7, LOWER_BOUND, 3)
+    table.store(67890, 40, 2, UPPER_BOUND)
+    assert table.probe(12345) == (-250, 7, LOWER_BOUND, 3)
+    assert table.probe(67890) == (40, 2, UPPER_BOUND, None)
+    assert table.probe(11111) is None
+    assert (table.hits, table.misses) == (2, 1)
+
+
+def test_size_follows_the_memory_budget():
+    table = TranspositionTable(1)
+    assert table.get_counters()['memory_mb'] <= 1
+
+
+def test_depth_policy_keeps_the_deeper_result():
+    table = TranspositionTable(1, 'depth')
+    # Two keys falling into the same slot
+    key, other = 5, 5 + table.size
+    table.store(key, 10, 8, EXACT)
+    table.store(other, 20, 3, EXACT)
+    assert table.probe(key) == (10, 8, EXACT, None)
+    assert table.probe(other) is None
+    table.store(other, 30, 9, EXACT)
+    assert table.probe(other) == (30, 9, EXACT, None)
+
+
+def test_always_policy_replaces_and_age_policy_replaces_old_searches():
+    table = TranspositionTable(1, 'always')
+    key, other = 5, 5 + table.size
+    table.store(key, 10, 8, EXACT)
+    table.store(other, 20, 3, EXACT)
+    assert table.probe(other) == (20, 3, EXACT, None)
+
+    table = TranspositionTable(1, 'age')
+    table.store(key, 10, 8, EXACT)
+    table.store(other, 20, 3, EXACT)
+    assert table.probe(other) is None
+    table.new_search()
+    table.store(other, 20, 3, EXACT)
+    assert table.probe(other) == (20, 3, EXACT, None)
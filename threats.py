@@ -0,0 +1,87 @@
+from constants import *
+from lines import line_table
+
+
+class ThreatMap:
+    """
+    Immediate threats of both players, kept up to date move after move.
+
+    For each player, `wins` holds the bits of the empty cells that would
+    complete one of its lines. Playing a token can only create new winning
+    cells on the lines going through it, and can only remove the cell it
+    occupies, so play() updates the map from the few lines through the new
+    token instead of rescanning the board. undo() restores the previous map.
+
+    Moves must go through play() and undo() for the map to stay in sync
+    with its BitBoard.
+    """
+
+    __slots__ = ('board', 'column_masks', 'line_masks', 'bit_lines', 'wins', 'history')
+
+    def __init__(self, board):
+        self.board = board
+        self.column_masks = [((1 << board.rows) - 1) << (col * board.stride) for col in range(board.columns)]
+        # Masks of the winning lines, and of the ones going through each bit
+        table = line_table(board.rows, board.columns, board.connect)
+        self.line_masks = table.masks
+        self.bit_lines = table.bit_lines
+        self.rebuild()
+
+    def rebuild(self):
+        """Computes the map from scratch, in one pass over the lines"""
+        board = self.board
+        empty = board.board_mask ^ board.mask
+        self.wins = {PLAYER_X: 0, PLAYER_O: 0}
+        self.history = []  # Maps before each move played through play()
+        if not board.mask:
+            return
+        for player in (PLAYER_X, PLAYER_O):
+            bits = board.bits[player]
+            for mask in self.line_masks:
+                rest = mask & ~bits
+                # A single missing cell, and it is empty
+                if rest & empty and not rest & (rest - 1):
+                    self.wins[player] |= rest
+
+    def play(self, column, player):
+        """Plays the move on the board, updates the map and returns the row"""
+        board = self.board
+        self.history.append((self.wins[PLAYER_X], self.wins[PLAYER_O]))
+        row = board.play(column, player)
+        index = column * board.stride + board.heights[column] - 1
+        bit = 1 << index
+        bits = board.bits[player]
+        empty = board.board_mask ^ board.mask
+        wins = self.wins[player]
+        for mask in self.bit_lines[index]:
+            rest = mask & ~bits
+            if rest & empty and not rest & (rest - 1):
+                wins |= rest
+        opponent = PLAYER_X if player == PLAYER_O else PLAYER_O
+        self.wins[player] = wins & ~bit
+        self.wins[opponent] &= ~bit
+        return row
+
+    def undo(self):
+        """Cancels the last move, returns (player, column, row)"""
+        self.wins[PLAYER_X], self.wins[PLAYER_O] = self.history.pop()
+        return self.board.undo()
+
+    def _columns(self, bits):
+        return {col for col, mask in enumerate(self.column_masks) if bits & mask}
+
+    def playable_threats(self, player):
+        """Bits of the winning cells of `player` that can be played right now"""
+        return self.wins[player] & self.board.playable_cells()
+
+    def winning_columns(self, player):
+        """Columns where `player` wins immediately"""
+        return self._columns(self.playable_threats(player))
+
+    def unsafe_columns(self, player):
+        """
+        Columns `player` must not play in: the token would land right under
+        a winning cell of the opponent, who would then play it.
+        """
+        opponent = PLAYER_X if player == PLAYER_O else PLAYER_O
+        return self._columns((self.wins[opponent] >> 1) & self.board.playable_cells())
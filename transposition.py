@@ -0,0 +1,115 @@
+from array import array
+from constants import *
+
+# Bound types of a stored score
+EXACT = 1
+LOWER_BOUND = 2  # The search failed high: the real score is >= the stored one
+UPPER_BOUND = 3  # The search failed low: the real score is <= the stored one
+
+# Replacement policies when two positions fall into the same slot
+REPLACEMENT_POLICIES = ('always', 'depth', 'age')
+
+# Every entry takes two 64-bit words: the full hash and the packed data
+ENTRY_SIZE = 16
+
+# Layout of the packed data word
+_SCORE_OFFSET = 1 << 31
+_DEPTH_SHIFT = 32
+_FLAG_SHIFT = 40
+_MOVE_SHIFT = 42
+_AGE_SHIFT = 50
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of search results keyed by Zobrist hash.
+
+    Entries live in two preallocated arrays, so the memory used never grows
+    past the budget given at creation. The replacement policy decides what
+    happens when a new result falls into an occupied slot:
+    - 'always': the new result replaces the old one
+    - 'depth': the old result is kept if it was searched deeper
+    - 'age': like 'depth', but results of previous searches are always replaced
+    """
+
+    def __init__(self, size_mb=TT_SIZE_MB, replacement=TT_REPLACEMENT):
+        if replacement not in REPLACEMENT_POLICIES:
+            raise ValueError(f"Unknown replacement policy: {replacement}")
+        self.replacement = replacement
+        self.size = max(1, int(size_mb * 1024 * 1024) // ENTRY_SIZE)
+        self.keys = array('Q', bytes(8 * self.size))
+        self.data = array('Q', bytes(8 * self.size))
+        self.age = 0
+        self.reset_counters()
+
+    def reset_counters(self):
+        """Resets the hit and miss counters"""
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+        self.rejections = 0
+
+    def clear(self):
+        """Empties the table"""
+        self.keys = array('Q', bytes(8 * self.size))
+        self.data = array('Q', bytes(8 * self.size))
+        self.age = 0
+        self.reset_counters()
+
+    def new_search(self):
+        """Marks the start of a new search, used by the 'age' policy"""
+        self.age = (self.age + 1) & 0xFF
+
+    def probe(self, key):
+        """
+        Looks up a position.
+        Returns (score, depth, flag, move) or None if it isn't stored.
+        """
+        index = key % self.size
+        data = self.data[index]
+        if data and self.keys[index] == key:
+            self.hits += 1
+            move = (data >> _MOVE_SHIFT) & 0xFF
+            return ((data & 0xFFFFFFFF) - _SCORE_OFFSET,
+                    (data >> _DEPTH_SHIFT) & 0xFF,
+                    (data >> _FLAG_SHIFT) & 0x3,
+                    move - 1 if move else None)
+        self.misses += 1
+        return None
+
+    def store(self, key, score, depth, flag, move=None):
+        """Stores a search result according to the replacement policy"""
+        index = key % self.size
+        old = self.data[index]
+        if old and self.keys[index] != key:
+            old_depth = (old >> _DEPTH_SHIFT) & 0xFF
+            old_age = (old >> _AGE_SHIFT) & 0xFF
+            if self.replacement == 'depth' and old_depth > depth:
+                self.rejections += 1
+                return
+            if self.replacement == 'age' and old_age == self.age and old_depth > depth:
+                self.rejections += 1
+                return
+            self.replacements += 1
+        self.keys[index] = key
+        self.data[index] = ((score + _SCORE_OFFSET)
+                            | min(depth, 0xFF) << _DEPTH_SHIFT
+                            | flag << _FLAG_SHIFT
+                            | (0 if move is None else move + 1) << _MOVE_SHIFT
+                            | self.age << _AGE_SHIFT)
+        self.stores += 1
+
+    def get_counters(self):
+        """Returns the usage counters of the table"""
+        lookups = self.hits + self.misses
+        return {
+            'size': self.size,
+            'memory_mb': round(self.size * ENTRY_SIZE / (1024 * 1024), 2),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups * 100, 1) if lookups > 0 else 0,
+            'stores': self.stores,
+            'replacements': self.replacements,
+            'rejections': self.rejections
+        }
@@ -0,0 +1,88 @@
+import numpy as np
+from constants import *
+from lines import line_table, HORIZONTAL
+
+
+class VectorizedEvaluator:
+    """
+    Scores all the candidate moves of a position in one NumPy pass.
+
+    The child positions are stacked in a (moves, ROWS * COLUMNS) array and
+    every feature of Connect4.evaluate_move is computed for all of them at
+    once with index arrays of the cells of the lines it looks at:
+    - winning lines: does the move win (score 100)
+    - otherwise the same terms as evaluate_position, for the player to move
+      after the move: center tokens, horizontal alignments of connect - 1,
+      learned pattern frequencies and the pairs of _evaluate_learned_patterns
+    The scores are the ones of evaluate_move, up to float rounding.
+    """
+
+    def __init__(self, rows=ROWS, columns=COLUMNS, connect=CONNECT):
+        self.rows = rows
+        self.columns = columns
+        # Bitboard bit of every grid cell, row 0 being the top of the grid
+        self.cell_bits = np.array([col * (rows + 1) + rows - 1 - row
+                                   for row in range(rows) for col in range(columns)], dtype=np.intp)
+        self.bitboard_bytes = ((rows + 1) * columns + 7) // 8
+
+        def cells(lines):
+            return np.array([[row * columns + col for row, col in line] for line in lines], dtype=np.intp)
+
+        # Winning lines, then the alignments of _evaluate_base_position and
+        # _evaluate_learned_patterns
+        self.windows = cells(line_table(rows, columns, connect).lines)
+        self.center = np.array([row * columns + columns // 2 for row in range(rows)], dtype=np.intp)
+        self.triples = cells(line_table(rows, columns, connect - 1).lines_in_direction(HORIZONTAL))
+        self.pairs = cells(line_table(rows, columns, 2).lines)
+
+        self._patterns = None  # Learned patterns (and their version) of the cached weights
+        self._pattern_weights = {}
+
+    def _learned_weights(self, learned_patterns, player):
+        """Per-cell bonus of the learned patterns for the tokens of `player`"""
+        key = (learned_patterns, learned_patterns.version)
+        if key != self._patterns:
+            self._patterns = key
+            self._pattern_weights = {}
+        weights = self._pattern_weights.get(player)
+        if weights is None:
+            opponent = PLAYER_X if player == PLAYER_O else PLAYER_O
+            weights = (learned_patterns.counts[player].ravel() * 0.5
+                       - learned_patterns.counts[opponent].ravel() * 0.8)
+            self._pattern_weights[player] = weights
+        return weights
+
+    def _cells(self, bits):
+        """Grid cells (flattened) occupied in the bitboard `bits`, of any size"""
+        unpacked = np.unpackbits(np.frombuffer(bits.to_bytes(self.bitboard_bytes, 'little'), dtype=np.uint8),
+                                 bitorder='little')
+        return unpacked[self.cell_bits].astype(bool)
+
+    def evaluate_moves(self, bitboard, player, learned_patterns=None):
+        """
+        Returns {column: score} for `player` dropping a token in each of the
+        playable columns of the position.
+        """
+        columns = [col for col in range(self.columns) if bitboard.can_play(col)]
+        if not columns:
+            return {}
+        opponent = PLAYER_X if player == PLAYER_O else PLAYER_O
+        own = self._cells(bitboard.bits[player])
+        other = self._cells(bitboard.bits[opponent])
+
+        # Child positions: one row per move, with the token of the move added
+        landing = [(self.rows - 1 - bitboard.heights[col]) * self.columns + col for col in columns]
+        children = np.repeat(own[None, :], len(columns), axis=0)
+        children[np.arange(len(columns)), landing] = True
+
+        wins = children[:, self.windows].all(axis=2).any(axis=1)
+
+        # Every other term is computed for the opponent, who plays next
+        tokens = other
+        score = 3 * int(tokens[self.center].sum())
+        score += 5 * int(tokens[self.triples].all(axis=1).sum())
+        if learned_patterns:
+            score += float(tokens @ self._learned_weights(learned_patterns, opponent))
+            score += 2 * int(tokens[self.pairs].all(axis=1).sum())
+        scores = np.where(wins, 100, score)
+        return {col: scores[i].item() for i, col in enumerate(columns)}
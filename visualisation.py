@@ -1,7 +1,4 @@
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 from datetime import datetime
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import tkinter as tk
 from constants import *
 
@@ -11,6 +8,9 @@ class StatsVisualization:
 
     def create_figure(self):
         """Creates a matplotlib figure with multiple charts"""
+        # matplotlib is only imported when the charts are first shown, not at startup
+        import matplotlib.pyplot as plt
+        import matplotlib.dates as mdates
         fig = plt.Figure(figsize=(10, 8))
         fig.patch.set_facecolor(COLORS['background'])
         
@@ -90,6 +90,7 @@ class StatsVisualization:
 
     def show_graphs(self, parent):
         """Displays the charts in a Tkinter window"""
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
         graph_window = tk.Toplevel(parent)
         graph_window.title("Stats Visualization")
         graph_window.configure(bg=COLORS['background'])